@@ -1,40 +1,289 @@
+import time
+STARTED_AT = time.perf_counter()  # taken before the heavy imports so startup timing includes them
+
 import gradio as gr
 import aiosqlite
 import asyncio
 import httpx
 import json
-import whisper
+import statistics
+import re
 import base64
-
-# Load Whisper model for speech recognition
-print("Loading Whisper model...")
-whisper_model = whisper.load_model("base.en", device="cpu")
-print("Whisper model loaded!")
+import os
+import io
+import copy
+import hashlib
+import heapq
+import itertools
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager
+from html import escape
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import numpy as np
+from PIL import Image, ImageOps
 
 DATABASE = "lists.db"
+PORT = int(os.environ.get("LISTS_PORT", "7862"))
+
+# Connection pool tuning: one writer plus DB_READERS read-only connections
+DB_READERS = int(os.environ.get("LISTS_DB_READERS", "4"))
+DB_MMAP_SIZE = int(os.environ.get("LISTS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE = int(os.environ.get("LISTS_DB_CACHE_SIZE", "-16000"))  # negative = KiB
+
+# Whisper speech model: which size to load and whether to load it at startup
+# (otherwise it loads on the first Transcribe click)
+WHISPER_MODEL = os.environ.get("LISTS_WHISPER_MODEL", "base.en")
+WHISPER_PRELOAD = os.environ.get("LISTS_WHISPER_PRELOAD", "1") == "1"
+
+# Transcription worker pool: concurrent Whisper jobs, how many more may wait,
+# per-job timeout in seconds, and torch threads per worker (0 = split the CPUs)
+TRANSCRIBE_WORKERS = int(os.environ.get("LISTS_TRANSCRIBE_WORKERS", "2"))
+TRANSCRIBE_QUEUE_SIZE = int(os.environ.get("LISTS_TRANSCRIBE_QUEUE_SIZE", "8"))
+TRANSCRIBE_TIMEOUT = float(os.environ.get("LISTS_TRANSCRIBE_TIMEOUT", "120"))
+TRANSCRIBE_TORCH_THREADS = int(os.environ.get("LISTS_TRANSCRIBE_TORCH_THREADS", "0"))
+
+# Recordings are decoded to 16 kHz mono once and trimmed before Whisper:
+# leading/trailing silence is cut, pauses are shortened to AUDIO_MAX_PAUSE
+# seconds, and recordings with less than AUDIO_MIN_SPEECH seconds of speech
+# skip Whisper altogether
+AUDIO_TRIM = os.environ.get("LISTS_AUDIO_TRIM", "1") == "1"
+AUDIO_MAX_PAUSE = float(os.environ.get("LISTS_AUDIO_MAX_PAUSE", "0.5"))
+AUDIO_MIN_SPEECH = float(os.environ.get("LISTS_AUDIO_MIN_SPEECH", "0.3"))
+
+# Ollama: server, models, connection limits, and connect/read timeouts per model
+OLLAMA_URL = os.environ.get("LISTS_OLLAMA_URL", "http://localhost:11434")
+OLLAMA_TEXT_MODEL = os.environ.get("LISTS_OLLAMA_TEXT_MODEL", "qwen2.5:7b-instruct")
+OLLAMA_VISION_MODEL = os.environ.get("LISTS_OLLAMA_VISION_MODEL", "qwen3-vl:8b")
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("LISTS_OLLAMA_MAX_CONNECTIONS", "8"))
+OLLAMA_MAX_KEEPALIVE = int(os.environ.get("LISTS_OLLAMA_MAX_KEEPALIVE", "4"))
+OLLAMA_TEXT_TIMEOUT = httpx.Timeout(
+    float(os.environ.get("LISTS_OLLAMA_TEXT_READ_TIMEOUT", "30")),
+    connect=float(os.environ.get("LISTS_OLLAMA_TEXT_CONNECT_TIMEOUT", "5")),
+)
+OLLAMA_VISION_TIMEOUT = httpx.Timeout(
+    float(os.environ.get("LISTS_OLLAMA_VISION_READ_TIMEOUT", "120")),
+    connect=float(os.environ.get("LISTS_OLLAMA_VISION_CONNECT_TIMEOUT", "5")),
+)
+
+# Ollama scheduler: requests running at once in total (match Ollama's
+# OLLAMA_NUM_PARALLEL; anything more just waits in Ollama's own queue, where
+# priorities don't apply) and per model, how many more may wait, and seconds
+# a request may wait for a slot before it is refused
+OLLAMA_SLOTS = int(os.environ.get("LISTS_OLLAMA_SLOTS", "1"))
+OLLAMA_TEXT_SLOTS = int(os.environ.get("LISTS_OLLAMA_TEXT_SLOTS", "2"))
+OLLAMA_VISION_SLOTS = int(os.environ.get("LISTS_OLLAMA_VISION_SLOTS", "1"))
+OLLAMA_QUEUE_SIZE = int(os.environ.get("LISTS_OLLAMA_QUEUE_SIZE", "16"))
+OLLAMA_QUEUE_TIMEOUT = float(os.environ.get("LISTS_OLLAMA_QUEUE_TIMEOUT", "60"))
+
+# Structured output: constrain Bruno and Smart Scan replies to a JSON array of
+# item strings (0 = the older free-form "JSON array only" prompts), and the
+# most tokens either may generate for one request
+OLLAMA_STRUCTURED = os.environ.get("LISTS_OLLAMA_STRUCTURED", "1") == "1"
+OLLAMA_NUM_PREDICT_MAX = int(os.environ.get("LISTS_OLLAMA_NUM_PREDICT_MAX", "768"))
+
+# Bruno's rule-based parser answers on its own when its confidence (0-1) is
+# at least this; below it the text goes to the model (above 1 = always)
+PARSE_RULE_CONFIDENCE = float(os.environ.get("LISTS_PARSE_RULE_CONFIDENCE", "0.8"))
+
+# Ollama model residency: load both models in the background at startup, how
+# long Ollama keeps each loaded after its last request (Ollama duration
+# syntax; "-1" = forever), and optionally re-ping the warm models (comma
+# separated; by default just Bruno's, since pinging two models that don't fit
+# in memory together would evict each other) every interval seconds during
+# active hours ("7-23" = 07:00 to 22:59 local time; empty = never)
+OLLAMA_PRELOAD = os.environ.get("LISTS_OLLAMA_PRELOAD", "1") == "1"
+OLLAMA_TEXT_KEEP_ALIVE = os.environ.get("LISTS_OLLAMA_TEXT_KEEP_ALIVE", "60m")
+OLLAMA_VISION_KEEP_ALIVE = os.environ.get("LISTS_OLLAMA_VISION_KEEP_ALIVE", "15m")
+OLLAMA_WARM_HOURS = os.environ.get("LISTS_OLLAMA_WARM_HOURS", "")
+OLLAMA_WARM_MODELS = [m.strip() for m in os.environ.get("LISTS_OLLAMA_WARM_MODELS", OLLAMA_TEXT_MODEL).split(",") if m.strip()]
+OLLAMA_WARM_INTERVAL = float(os.environ.get("LISTS_OLLAMA_WARM_INTERVAL", "240"))
+OLLAMA_LOAD_TIMEOUT = httpx.Timeout(float(os.environ.get("LISTS_OLLAMA_LOAD_TIMEOUT", "300")), connect=5.0)
+
+# Bruno parse cache: in-memory LRU entries, and how long results live on disk (seconds)
+PARSE_CACHE_MEMORY = int(os.environ.get("LISTS_PARSE_CACHE_MEMORY", "256"))
+PARSE_CACHE_TTL = float(os.environ.get("LISTS_PARSE_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Smart Scan cache: in-memory LRU entries and the most scans kept on disk
+SCAN_CACHE_MEMORY = int(os.environ.get("LISTS_SCAN_CACHE_MEMORY", "64"))
+SCAN_CACHE_MAX_ENTRIES = int(os.environ.get("LISTS_SCAN_CACHE_MAX_ENTRIES", "2000"))
+
+# Smart Scan uploads are downscaled to this long edge (pixels) and re-encoded
+# as JPEG or WEBP at this quality before being sent to the vision model
+SCAN_MAX_EDGE = int(os.environ.get("LISTS_SCAN_MAX_EDGE", "1600"))
+SCAN_FORMAT = os.environ.get("LISTS_SCAN_FORMAT", "JPEG").upper()
+SCAN_QUALITY = int(os.environ.get("LISTS_SCAN_QUALITY", "85"))
+
+# Multi-page Smart Scan: pages sent to the vision model at the same time
+SCAN_CONCURRENCY = int(os.environ.get("LISTS_SCAN_CONCURRENCY", "2"))
+
+# Completed items shown when a list opens; older ones load on demand
+COMPLETED_PAGE_SIZE = int(os.environ.get("LISTS_COMPLETED_PAGE_SIZE", "50"))
+
+# In-process cache of list metadata, list views and dashboard HTML (0 disables)
+VIEW_CACHE_ENTRIES = int(os.environ.get("LISTS_VIEW_CACHE_ENTRIES", "512"))
+
+# Change feed: recent patches kept per list for reconnecting clients, events
+# buffered per slow subscriber before it is told to reload, and seconds
+# between keep-alive comments on idle streams
+FEED_HISTORY = int(os.environ.get("LISTS_FEED_HISTORY", "200"))
+FEED_QUEUE_SIZE = int(os.environ.get("LISTS_FEED_QUEUE_SIZE", "64"))
+FEED_KEEPALIVE = float(os.environ.get("LISTS_FEED_KEEPALIVE", "15"))
+
+# Single-list checkboxes flip instantly in the browser and are sent to the
+# server in one batch this many milliseconds after the last tap (0 = one
+# round trip per toggle)
+TOGGLE_BATCH_MS = int(os.environ.get("LISTS_TOGGLE_BATCH_MS", "600"))
+
+# Startup milestones in seconds since STARTED_AT, served at /stats
+startup_times = {}
 
 # ============== Database Setup ==============
+def item_key(name):
+    """Normalized item name used to spot duplicates within a list.
+
+    Case, accents, runs of whitespace and surrounding punctuation are ignored,
+    so "Milk", " milk." and "MILK" share a key; "2% Milk" keeps its own. A
+    name that is all punctuation ("--", "!!") keeps its punctuation, so such
+    names don't all share the empty key.
+    """
+    text = unicodedata.normalize("NFKD", name)
+    text = " ".join("".join(ch for ch in text if not unicodedata.combining(ch)).casefold().split())
+    return text.strip(".,;:!?-_*'\"()[] ") or text
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run, so init_db only applies the new ones. Append; never edit old entries.
+MIGRATIONS = [
+    # 1: base schema
+    [
+        """
+        CREATE TABLE IF NOT EXISTS lists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            list_type TEXT DEFAULT 'Shopping',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            list_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            purchased INTEGER DEFAULT 0,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (list_id) REFERENCES lists(id) ON DELETE CASCADE
+        )
+        """,
+    ],
+    # 2: covering indexes for list views, dashboard previews and type filters
+    [
+        "CREATE INDEX IF NOT EXISTS idx_items_list_purchased_added ON items(list_id, purchased, added_at DESC, name)",
+        "CREATE INDEX IF NOT EXISTS idx_lists_type_created ON lists(list_type, created_at DESC)",
+    ],
+    # 3: persistent tier of the AI result caches
+    [
+        """
+        CREATE TABLE IF NOT EXISTS ai_cache (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ai_cache_kind_created ON ai_cache(kind, created_at)",
+    ],
+    # 4: deterministic newest-first order (id breaks added_at ties) for keyset paging
+    [
+        "DROP INDEX IF EXISTS idx_items_list_purchased_added",
+        "CREATE INDEX IF NOT EXISTS idx_items_list_purchased_added_id ON items(list_id, purchased, added_at DESC, id DESC)",
+    ],
+    # 5: per-list revision, advanced by every write, for the change feed
+    [
+        "ALTER TABLE lists ADD COLUMN revision INTEGER NOT NULL DEFAULT 0",
+    ],
+    # 6: full-text search over item and list names, kept in sync by triggers
+    [
+        *[
+            statement
+            for table in ("items", "lists")
+            for statement in (
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                    name, content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+                """,
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name);
+                END
+                """,
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                END
+                """,
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF name ON {table} BEGIN
+                    INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                    INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name);
+                END
+                """,
+                f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+            )
+        ],
+    ],
+    # 7: quantities and a per-list unique normalized name, so adding an item
+    # that is already on the list merges into it; existing duplicates fold into
+    # the row a list view shows first, carrying the open rows' quantity
+    [
+        "ALTER TABLE items ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE items ADD COLUMN name_key TEXT",
+        "UPDATE items SET name_key = item_key(name)",
+        """
+        CREATE TEMP TABLE item_dupes AS
+        SELECT id,
+               ROW_NUMBER() OVER (PARTITION BY list_id, name_key ORDER BY purchased, added_at DESC, id DESC) AS rn,
+               SUM(CASE WHEN purchased THEN 0 ELSE quantity END) OVER (PARTITION BY list_id, name_key) AS open_quantity
+        FROM items
+        """,
+        """
+        UPDATE items SET quantity = d.open_quantity
+        FROM item_dupes d
+        WHERE items.id = d.id AND d.rn = 1 AND d.open_quantity > 1
+        """,
+        "DELETE FROM items WHERE id IN (SELECT id FROM item_dupes WHERE rn > 1)",
+        "DROP TABLE item_dupes",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_items_list_name_key ON items(list_id, name_key)",
+    ],
+]
+
+async def migrate(db):
+    """Apply pending MIGRATIONS, each in its own transaction. Safe to rerun."""
+    cursor = await db.execute("PRAGMA user_version")
+    version = (await cursor.fetchone())[0]
+    await db.create_function("item_key", 1, item_key, deterministic=True)
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        await db.execute("BEGIN")
+        try:
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute(f"PRAGMA user_version = {number}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        print(f"Applied database migration {number}")
+
 async def init_db():
     async with aiosqlite.connect(DATABASE) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS lists (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                list_type TEXT DEFAULT 'Shopping',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                list_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                purchased INTEGER DEFAULT 0,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (list_id) REFERENCES lists(id) ON DELETE CASCADE
-            )
-        """)
-        await db.commit()
+        await migrate(db)
 
         # Sample data if empty
         cursor = await db.execute("SELECT COUNT(*) FROM lists")
@@ -60,84 +309,1221 @@ async def init_db():
                 (5, "Finish report"), (5, "Email client"), (5, "Review PR"),
                 (6, "Vacuum living room"), (6, "Do laundry"), (6, "Clean bathroom"),
             ]
-            for list_id, name in sample_items:
-                await db.execute("INSERT INTO items (list_id, name) VALUES (?, ?)", (list_id, name))
+            await db.executemany(
+                "INSERT INTO items (list_id, name, name_key) VALUES (?, ?, ?)",
+                [(list_id, name, item_key(name)) for list_id, name in sample_items]
+            )
             await db.commit()
 
+# ============== Connection Pool ==============
+class ConnectionPool:
+    """Long-lived aiosqlite connections shared by every database helper.
+
+    One writer connection (serialized by a lock) and a queue of reader
+    connections, all in WAL mode so reads never block on the writer.
+    """
+
+    def __init__(self, path, readers=DB_READERS, mmap_size=DB_MMAP_SIZE, cache_size=DB_CACHE_SIZE):
+        self.path = path
+        self.readers = readers
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self._writer = None
+        self._write_lock = None
+        self._idle_readers = None
+        self._counters = {}
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    async def _connect(self, readonly=False):
+        db = await aiosqlite.connect(self.path)
+        db.row_factory = aiosqlite.Row
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("PRAGMA synchronous=NORMAL")
+        await db.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        await db.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        if readonly:
+            await db.execute("PRAGMA query_only=ON")
+        return db
+
+    async def open(self):
+        if self.is_open:
+            return
+        self._counters = {
+            kind: {"checkouts": 0, "waiting": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for kind in ("read", "write")
+        }
+        self._write_lock = asyncio.Lock()
+        self._idle_readers = asyncio.Queue()
+        self._writer = await self._connect()
+        for _ in range(self.readers):
+            self._idle_readers.put_nowait(await self._connect(readonly=True))
+        print(f"Database pool open: 1 writer, {self.readers} readers on {self.path}")
+
+    async def close(self):
+        if not self.is_open:
+            return
+        while not self._idle_readers.empty():
+            await self._idle_readers.get_nowait().close()
+        await self._writer.close()
+        self._writer = None
+        print("Database pool closed")
+
+    def _check_open(self):
+        if not self.is_open:
+            raise RuntimeError("Database pool is not open; call db_pool.open() first")
+
+    def _observe(self, kind, started):
+        waited = (time.perf_counter() - started) * 1000
+        counters = self._counters[kind]
+        counters["checkouts"] += 1
+        counters["wait_ms_total"] += waited
+        counters["wait_ms_max"] = max(counters["wait_ms_max"], waited)
+
+    @asynccontextmanager
+    async def read(self):
+        """Check out a read-only connection."""
+        self._check_open()
+        started = time.perf_counter()
+        self._counters["read"]["waiting"] += 1
+        try:
+            db = await self._idle_readers.get()
+        finally:
+            self._counters["read"]["waiting"] -= 1
+        self._observe("read", started)
+        try:
+            yield db
+        finally:
+            self._idle_readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def write(self):
+        """Check out the writer inside one transaction; commits on success, rolls back on error."""
+        self._check_open()
+        started = time.perf_counter()
+        self._counters["write"]["waiting"] += 1
+        try:
+            await self._write_lock.acquire()
+        finally:
+            self._counters["write"]["waiting"] -= 1
+        self._observe("write", started)
+        try:
+            await self._writer.execute("BEGIN IMMEDIATE")
+            yield self._writer
+            await self._writer.commit()
+        except BaseException:
+            await self._writer.rollback()
+            raise
+        finally:
+            self._write_lock.release()
+
+    def stats(self):
+        """Checkout counts and wait times per connection kind."""
+        stats = {"open": self.is_open, "readers": self.readers,
+                 "readers_idle": self._idle_readers.qsize() if self.is_open else 0}
+        for kind, counters in self._counters.items():
+            checkouts = counters["checkouts"]
+            stats[kind] = {
+                "checkouts": checkouts,
+                "waiting": counters["waiting"],
+                "wait_ms_avg": round(counters["wait_ms_total"] / checkouts, 3) if checkouts else 0.0,
+                "wait_ms_max": round(counters["wait_ms_max"], 3),
+            }
+        return stats
+
+db_pool = ConnectionPool(DATABASE)
+
+# ============== View Cache ==============
+class ViewCache:
+    """In-process LRU over list reads and rendered dashboard HTML.
+
+    Keys are tuples led by their kind: ("lists", list_type), ("view", id) and
+    ("dashboard", filter_type). The write functions call
+    lists_changed()/items_changed() after their transaction commits, dropping
+    only the entries that write can affect. A read that overlapped any
+    invalidation is returned but not stored, so a stale snapshot can't be
+    cached after the write that replaced it.
+    """
+
+    KINDS = ("lists", "view", "dashboard")
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.counters = {kind: {"hits": 0, "misses": 0, "invalidations": 0} for kind in self.KINDS}
+
+    async def fetch(self, key, loader):
+        """Return the cached value for key, or await loader() and cache its result."""
+        counters = self.counters[key[0]]
+        if key in self._entries:
+            counters["hits"] += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        counters["misses"] += 1
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation and self.max_entries:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys):
+        self._generation += 1
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.counters[key[0]]["invalidations"] += 1
+
+    def lists_changed(self, list_id, list_type):
+        """A list was created or deleted."""
+        self.invalidate(("lists", None), ("lists", list_type), ("view", list_id),
+                        ("dashboard", "All"), ("dashboard", list_type))
+
+    def items_changed(self, list_id, list_type):
+        """Items of one list were added, toggled or removed."""
+        self.invalidate(("view", list_id), ("dashboard", "All"), ("dashboard", list_type))
+
+    def stats(self):
+        stats = {"entries": len(self._entries)}
+        hits = misses = 0
+        for kind, counters in self.counters.items():
+            lookups = counters["hits"] + counters["misses"]
+            stats[kind] = {**counters, "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None}
+            hits += counters["hits"]
+            misses += counters["misses"]
+        stats["hit_rate"] = round(hits / (hits + misses), 3) if hits + misses else None
+        return stats
+
+view_cache = ViewCache(VIEW_CACHE_ENTRIES)
+
+# ============== Change Feed ==============
+class FeedSubscription:
+    """One client's stream of encoded server-sent events for a list."""
+
+    def __init__(self, feed, list_id, queue_size):
+        self.feed = feed
+        self.list_id = list_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def _drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def deliver(self, message, revision):
+        if self.queue.full():
+            # Too far behind to catch up event by event: replace the backlog with a reload
+            self._drain()
+            self.feed.counters["reloads"] += 1
+            message = self.feed.reload_message(self.list_id, revision)
+        self.queue.put_nowait(message)
+
+    def end(self):
+        self._drain()
+        self.queue.put_nowait(None)
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+    async def __aiter__(self):
+        while True:
+            try:
+                message = await asyncio.wait_for(self.queue.get(), FEED_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+
+class ChangeFeed:
+    """Per-list revision log of row patches, fanned out to live subscribers.
+
+    Write functions publish a patch per committed write along with the list's
+    new revision. Each event is encoded once and queued to every subscriber
+    of that list, so N viewers cost no database reads. A short history per
+    list lets a reconnecting client resume from the revision it last saw;
+    anything older gets a reload event instead.
+    """
+
+    def __init__(self, history=200, queue_size=64):
+        self.history = history
+        self.queue_size = queue_size
+        self._revisions = {}
+        self._log = {}
+        self._subscribers = {}
+        self.counters = {"published": 0, "delivered": 0, "replayed": 0, "reloads": 0}
+
+    @staticmethod
+    def encode(revision, event):
+        return f"id: {revision}\ndata: {json.dumps(event)}\n\n"
+
+    def reload_message(self, list_id, revision):
+        return self.encode(revision, {"list_id": list_id, "revision": revision, "reload": True})
+
+    def publish(self, list_id, revision, event):
+        message = self.encode(revision, {**event, "revision": revision})
+        self._revisions[list_id] = max(revision, self._revisions.get(list_id, 0))
+        log = self._log.setdefault(list_id, deque(maxlen=self.history))
+        log.append((revision, message))
+        self.counters["published"] += 1
+        for subscription in self._subscribers.get(list_id, ()):
+            subscription.deliver(message, revision)
+            self.counters["delivered"] += 1
+
+    async def revision(self, list_id):
+        """Latest revision of a list; read from the database once per list per process."""
+        if list_id not in self._revisions:
+            async with db_pool.read() as db:
+                cursor = await db.execute("SELECT revision FROM lists WHERE id = ?", (list_id,))
+                row = await cursor.fetchone()
+            self._revisions[list_id] = max(row['revision'] if row else 0, self._revisions.get(list_id, 0))
+        return self._revisions[list_id]
+
+    async def subscribe(self, list_id, since=None):
+        """Register for a list's events, first replaying anything after `since`."""
+        current = await self.revision(list_id)
+        subscription = FeedSubscription(self, list_id, self.queue_size)
+        if since is not None and since < current:
+            missed = [message for revision, message in self._log.get(list_id, ()) if revision > since]
+            if len(missed) == current - since and len(missed) < self.queue_size:
+                for message in missed:
+                    subscription.queue.put_nowait(message)
+                self.counters["replayed"] += len(missed)
+            else:
+                subscription.queue.put_nowait(self.reload_message(list_id, current))
+                self.counters["reloads"] += 1
+        self._subscribers.setdefault(list_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._subscribers.get(subscription.list_id)
+        if subscribers:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.list_id]
+
+    def close(self):
+        """End every open stream (server shutdown)."""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.end()
+
+    def stats(self):
+        return {**self.counters, "lists_watched": len(self._subscribers),
+                "subscribers": sum(len(s) for s in self._subscribers.values())}
+
+change_feed = ChangeFeed(FEED_HISTORY, FEED_QUEUE_SIZE)
+
 # ============== Database Operations ==============
 async def get_lists(list_type=None):
-    async with aiosqlite.connect(DATABASE) as db:
-        db.row_factory = aiosqlite.Row
-        if list_type and list_type != "All":
-            cursor = await db.execute("SELECT * FROM lists WHERE list_type = ? ORDER BY created_at DESC", (list_type,))
-        else:
-            cursor = await db.execute("SELECT * FROM lists ORDER BY created_at DESC")
-        return await cursor.fetchall()
+    list_type = list_type if list_type and list_type != "All" else None
+
+    async def load():
+        async with db_pool.read() as db:
+            if list_type:
+                cursor = await db.execute("SELECT * FROM lists WHERE list_type = ? ORDER BY created_at DESC", (list_type,))
+            else:
+                cursor = await db.execute("SELECT * FROM lists ORDER BY created_at DESC")
+            return await cursor.fetchall()
+    return await view_cache.fetch(("lists", list_type), load)
 
 async def get_lists_by_type(list_type):
     """Get lists filtered by type for Smart Scan dropdown."""
-    async with aiosqlite.connect(DATABASE) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM lists WHERE list_type = ? ORDER BY created_at DESC", (list_type,))
-        return await cursor.fetchall()
-
-async def get_list_by_id(list_id):
-    async with aiosqlite.connect(DATABASE) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM lists WHERE id = ?", (list_id,))
-        return await cursor.fetchone()
+    return await get_lists(list_type)
 
 async def get_list_items(list_id):
-    async with aiosqlite.connect(DATABASE) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM items WHERE list_id = ? ORDER BY purchased ASC, added_at DESC", (list_id,))
+    async with db_pool.read() as db:
+        cursor = await db.execute(
+            "SELECT * FROM items WHERE list_id = ? ORDER BY purchased ASC, added_at DESC, id DESC", (list_id,)
+        )
         return await cursor.fetchall()
 
-async def get_items_preview(list_id):
-    async with aiosqlite.connect(DATABASE) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM items WHERE list_id = ? AND purchased = 0 ORDER BY added_at DESC", (list_id,))
-        return await cursor.fetchall()
+async def _items_page(db, list_id, purchased, limit, after):
+    if after is None:
+        cursor = await db.execute(
+            "SELECT * FROM items WHERE list_id = ? AND purchased = ? ORDER BY added_at DESC, id DESC LIMIT ?",
+            (list_id, int(purchased), limit),
+        )
+    else:
+        cursor = await db.execute(
+            "SELECT * FROM items WHERE list_id = ? AND purchased = ? AND (added_at, id) < (?, ?)"
+            " ORDER BY added_at DESC, id DESC LIMIT ?",
+            (list_id, int(purchased), *after, limit),
+        )
+    return await cursor.fetchall()
+
+def _page_cursor(rows, limit):
+    """Trim the look-ahead row fetched past `limit`; return (rows, cursor or None)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]['added_at'], rows[-1]['id'])
+
+async def get_items_page(list_id, purchased, limit, after=None):
+    """One keyset page of a list section, newest first.
+
+    `after` is the (added_at, id) of the last row already shown; returns
+    (rows, cursor) where cursor is None once the section is exhausted.
+    """
+    async with db_pool.read() as db:
+        rows = await _items_page(db, list_id, purchased, limit + 1, after)
+    return _page_cursor(rows, limit)
+
+async def get_list_view(list_id, page_size=COMPLETED_PAGE_SIZE):
+    """Everything the single-list view needs, independent of completed history.
+
+    Returns (list_info, items, completed_total, completed_cursor): items holds
+    every open item plus the newest page of completed ones. Snapshots at the
+    default page size are served from view_cache.
+    """
+    if page_size == COMPLETED_PAGE_SIZE:
+        return await view_cache.fetch(("view", list_id), lambda: _load_list_view(list_id, page_size))
+    return await _load_list_view(list_id, page_size)
+
+async def _load_list_view(list_id, page_size):
+    async with db_pool.read() as db:
+        cursor = await db.execute("SELECT * FROM lists WHERE id = ?", (list_id,))
+        list_info = await cursor.fetchone()
+        cursor = await db.execute("SELECT COUNT(*) FROM items WHERE list_id = ? AND purchased = 1", (list_id,))
+        completed_total = (await cursor.fetchone())[0]
+        open_items = await _items_page(db, list_id, False, -1, None)
+        completed = await _items_page(db, list_id, True, page_size + 1, None)
+    completed, completed_cursor = _page_cursor(completed, page_size)
+    return list_info, open_items + completed, completed_total, completed_cursor
+
+async def get_dashboard(list_type=None, preview_size=4):
+    """Load lists with item counts and unpurchased-item previews in two queries.
+
+    Returns (lists, previews): each list row carries has_items and open_count,
+    and previews maps list_id to the names of its newest unpurchased items.
+    """
+    kind = list_type if list_type and list_type != "All" else None
+    async with db_pool.read() as db:
+        cursor = await db.execute("""
+            SELECT l.*,
+                   EXISTS (SELECT 1 FROM items WHERE list_id = l.id) AS has_items,
+                   (SELECT COUNT(*) FROM items WHERE list_id = l.id AND purchased = 0) AS open_count
+            FROM lists l
+            WHERE ?1 IS NULL OR l.list_type = ?1
+            ORDER BY l.created_at DESC
+        """, (kind,))
+        lists = await cursor.fetchall()
+
+        cursor = await db.execute("""
+            SELECT i.list_id, i.name
+            FROM lists l JOIN items i ON i.id IN (
+                SELECT id FROM items
+                WHERE list_id = l.id AND purchased = 0
+                ORDER BY added_at DESC LIMIT ?2
+            )
+            WHERE ?1 IS NULL OR l.list_type = ?1
+            ORDER BY i.list_id, i.added_at DESC
+        """, (kind, preview_size))
+        previews = {}
+        for row in await cursor.fetchall():
+            previews.setdefault(row['list_id'], []).append(row['name'])
+        return lists, previews
+
+async def _bump_revision(db, list_id):
+    """Advance a list's revision inside a write transaction.
+
+    Returns (revision, list_type, completed_total), or None if the list is gone.
+    The caller publishes the change and invalidates view_cache once committed.
+    """
+    cursor = await db.execute(
+        "UPDATE lists SET revision = revision + 1 WHERE id = ? RETURNING revision, list_type", (list_id,)
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        return None
+    cursor = await db.execute("SELECT COUNT(*) FROM items WHERE list_id = ? AND purchased = 1", (list_id,))
+    return row['revision'], row['list_type'], (await cursor.fetchone())[0]
+
+def _items_committed(list_id, change, upserted=(), removed=()):
+    """Post-commit side of an item write: drop cached views and push the delta."""
+    if change is None:
+        return
+    revision, list_type, completed_total = change
+    view_cache.items_changed(list_id, list_type)
+    change_feed.publish(list_id, revision, {
+        **generate_list_patch(list_id, upserted=upserted, removed=removed),
+        "completed_total": completed_total,
+    })
+
+async def _items_by_list(db, item_ids):
+    """Group item ids by their list, read inside the write transaction before changing them."""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    cursor = await db.execute(
+        f"SELECT id, list_id FROM items WHERE id IN ({','.join('?' * len(item_ids))})", item_ids
+    )
+    by_list = {}
+    for row in await cursor.fetchall():
+        by_list.setdefault(row['list_id'], []).append(row['id'])
+    return by_list
+
+async def _rows_by_id(db, item_ids):
+    cursor = await db.execute(f"SELECT * FROM items WHERE id IN ({','.join('?' * len(item_ids))})", item_ids)
+    return await cursor.fetchall()
+
+SEARCH_HIGHLIGHT = ("\x02", "\x03")  # match markers, swapped for <mark> after escaping
+SEARCH_CANDIDATES = 200
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    Words are quoted so punctuation in the input can't be read as FTS5 syntax.
+    Single characters only match whole words; as prefixes they'd hit most of
+    the index (the prefix indexes cover 2 and 3 characters). Returns None when
+    there is nothing searchable.
+    """
+    words = re.findall(r"\w+", text.lower())
+    return " ".join(f'"{word}"*' if len(word) > 1 else f'"{word}"' for word in words) or None
+
+async def search(text, limit=20):
+    """Ranked (bm25) prefix search over list and item names.
+
+    Returns (lists, items); item rows carry list_name/list_type, and every row
+    has a `match` column with the matched words wrapped in SEARCH_HIGHLIGHT.
+    """
+    query = fts_query(text)
+    if query is None:
+        return [], []
+    start, end = SEARCH_HIGHLIGHT
+    async with db_pool.read() as db:
+        cursor = await db.execute("""
+            SELECT l.*, highlight(lists_fts, 0, ?2, ?3) AS match
+            FROM lists_fts JOIN lists l ON l.id = lists_fts.rowid
+            WHERE lists_fts MATCH ?1
+            ORDER BY lists_fts.rank LIMIT ?4
+        """, (query, start, end, limit))
+        lists = await cursor.fetchall()
+        # bm25 ranks only the newest SEARCH_CANDIDATES matches: FTS5 can stop a
+        # rowid-ordered scan early, while ranking every match of a short prefix
+        # ("pa") on a large history costs tens of milliseconds
+        cursor = await db.execute("""
+            SELECT i.*, l.name AS list_name, l.list_type, m.match
+            FROM (
+                SELECT rowid, rank, highlight(items_fts, 0, ?2, ?3) AS match
+                FROM items_fts WHERE items_fts MATCH ?1
+                ORDER BY rowid DESC LIMIT ?5
+            ) m
+            JOIN items i ON i.id = m.rowid
+            JOIN lists l ON l.id = i.list_id
+            ORDER BY m.rank LIMIT ?4
+        """, (query, start, end, limit, SEARCH_CANDIDATES))
+        items = await cursor.fetchall()
+    return lists, items
 
 async def create_list(name, list_type):
-    async with aiosqlite.connect(DATABASE) as db:
+    async with db_pool.write() as db:
         cursor = await db.execute("INSERT INTO lists (name, list_type) VALUES (?, ?)", (name, list_type))
-        await db.commit()
-        return cursor.lastrowid
+    view_cache.lists_changed(cursor.lastrowid, list_type)
+    return cursor.lastrowid
 
 async def delete_list(list_id):
-    async with aiosqlite.connect(DATABASE) as db:
+    async with db_pool.write() as db:
+        change = await _bump_revision(db, list_id)
         await db.execute("DELETE FROM items WHERE list_id = ?", (list_id,))
         await db.execute("DELETE FROM lists WHERE id = ?", (list_id,))
-        await db.commit()
+    view_cache.lists_changed(list_id, change[1] if change else None)
+    if change:
+        change_feed.publish(list_id, change[0], {"list_id": list_id, "deleted": True})
+
+# Merge-on-insert: a name already on the list (by item_key) is not added
+# again. An open item gets the new quantity added to it; a purchased one is
+# reactivated with the new quantity and moves back to the top of the list.
+# Rows come in as a JSON array of [name, key, quantity] so a whole batch is
+# one statement; RETURNING yields every inserted or merged row.
+MERGE_ITEMS_SQL = """
+    INSERT INTO items (list_id, name, name_key, quantity)
+    SELECT ?1, json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]')
+    FROM json_each(?2) WHERE true
+    ON CONFLICT (list_id, name_key) DO UPDATE SET
+        quantity = CASE WHEN purchased THEN excluded.quantity ELSE quantity + excluded.quantity END,
+        added_at = CASE WHEN purchased THEN CURRENT_TIMESTAMP ELSE added_at END,
+        purchased = 0
+    RETURNING *
+"""
 
-async def add_item(list_id, name):
-    async with aiosqlite.connect(DATABASE) as db:
-        await db.execute("INSERT INTO items (list_id, name) VALUES (?, ?)", (list_id, name))
-        await db.commit()
+async def _merge_items(list_id, entries):
+    """Insert or merge (name, quantity) pairs; returns the affected rows."""
+    payload = json.dumps([[name, item_key(name), quantity] for name, quantity in entries])
+    async with db_pool.write() as db:
+        cursor = await db.execute(MERGE_ITEMS_SQL, (list_id, payload))
+        # A name repeated within the batch comes back once per merge; keep the last
+        items = list({item['id']: item for item in await cursor.fetchall()}.values())
+        change = await _bump_revision(db, list_id)
+    _items_committed(list_id, change, upserted=items)
+    return items
 
-async def add_items_bulk(list_id, names):
-    async with aiosqlite.connect(DATABASE) as db:
-        for name in names:
-            await db.execute("INSERT INTO items (list_id, name) VALUES (?, ?)", (list_id, name.strip()))
-        await db.commit()
+async def add_item(list_id, name, quantity=1):
+    """Add an item, or merge it into the same-named one; returns the row."""
+    return (await _merge_items(list_id, [(name, quantity)]))[0]
+
+async def add_items_bulk(list_id, items):
+    """Add several items (names or (name, quantity) pairs) in one transaction,
+    merging duplicates; returns the rows."""
+    entries = [(item, 1) if isinstance(item, str) else item for item in items]
+    return await _merge_items(list_id, [(name.strip(), quantity) for name, quantity in entries])
 
 async def toggle_item(item_id):
-    async with aiosqlite.connect(DATABASE) as db:
+    """Flip an item's purchased flag and return its updated row (None if it is gone)."""
+    async with db_pool.write() as db:
         await db.execute("UPDATE items SET purchased = NOT purchased WHERE id = ?", (item_id,))
-        await db.commit()
+        cursor = await db.execute("SELECT * FROM items WHERE id = ?", (item_id,))
+        item = await cursor.fetchone()
+        change = await _bump_revision(db, item['list_id']) if item else None
+    if item:
+        _items_committed(item['list_id'], change, upserted=[item])
+    return item
+
+async def toggle_items(item_ids):
+    """Flip several items in one transaction."""
+    async with db_pool.write() as db:
+        await db.executemany("UPDATE items SET purchased = NOT purchased WHERE id = ?", [(i,) for i in item_ids])
+        changes = []
+        for list_id, ids in (await _items_by_list(db, item_ids)).items():
+            changes.append((list_id, await _bump_revision(db, list_id), await _rows_by_id(db, ids)))
+    for list_id, change, rows in changes:
+        _items_committed(list_id, change, upserted=rows)
+
+async def set_items_purchased(list_id, changes):
+    """Apply {item_id: purchased} in one transaction and return the resulting rows.
+
+    Writes are absolute states rather than flips, so a batch that races another
+    client's toggle converges instead of inverting it. Items that were deleted
+    or belong to another list are missing from the result.
+    """
+    async with db_pool.write() as db:
+        await db.executemany(
+            "UPDATE items SET purchased = ? WHERE id = ? AND list_id = ? AND purchased != ?",
+            [(int(bool(p)), item_id, list_id, int(bool(p))) for item_id, p in changes.items()],
+        )
+        placeholders = ",".join("?" * len(changes))
+        cursor = await db.execute(
+            f"SELECT * FROM items WHERE list_id = ? AND id IN ({placeholders})", (list_id, *changes)
+        )
+        rows = await cursor.fetchall()
+        change = await _bump_revision(db, list_id)
+    _items_committed(list_id, change, upserted=rows)
+    return rows
 
 async def delete_item(item_id):
-    async with aiosqlite.connect(DATABASE) as db:
-        await db.execute("DELETE FROM items WHERE id = ?", (item_id,))
-        await db.commit()
+    await delete_items([item_id])
+
+async def delete_items(item_ids):
+    """Delete several items in one transaction."""
+    async with db_pool.write() as db:
+        by_list = await _items_by_list(db, item_ids)
+        await db.executemany("DELETE FROM items WHERE id = ?", [(i,) for i in item_ids])
+        changes = [(list_id, await _bump_revision(db, list_id), ids) for list_id, ids in by_list.items()]
+    for list_id, change, ids in changes:
+        _items_committed(list_id, change, removed=ids)
+
+async def clear_completed(list_id):
+    """Delete every purchased item in a list; returns how many were removed."""
+    async with db_pool.write() as db:
+        cursor = await db.execute("DELETE FROM items WHERE list_id = ? AND purchased = 1 RETURNING id", (list_id,))
+        removed = [row['id'] for row in await cursor.fetchall()]
+        change = await _bump_revision(db, list_id) if removed else None
+    _items_committed(list_id, change, removed=removed)
+    return len(removed)
+
+# ============== AI Result Cache ==============
+def normalize_text(text):
+    """Lowercase and collapse whitespace so trivially different inputs share a cache key."""
+    return " ".join(text.lower().split())
+
+class ResultCache:
+    """Two-tier cache for AI results: an in-memory LRU over the ai_cache table.
+
+    Values are JSON-serializable and keyed by a hash of whatever determines the
+    result (input, model, prompt version). Entries older than ttl seconds are
+    treated as misses and purged; max_rows optionally caps the rows kept on disk.
+    """
+
+    PURGE_EVERY = 50  # writes between purges of expired/excess rows
+
+    def __init__(self, kind, memory_size=256, ttl=None, max_rows=None):
+        self.kind = kind
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._writes = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def get(self, key):
+        """Return the cached value, or None on a miss."""
+        entry = self._memory.get(key)
+        if entry is not None and not self._expired(entry[1]):
+            self._memory.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return entry[0]
+        async with db_pool.read() as db:
+            cursor = await db.execute("SELECT value, created_at FROM ai_cache WHERE kind = ? AND key = ?", (self.kind, key))
+            row = await cursor.fetchone()
+        if row is not None and not self._expired(row['created_at']):
+            value = json.loads(row['value'])
+            self._remember(key, value, row['created_at'])
+            self.counters["disk_hits"] += 1
+            return value
+        self.counters["misses"] += 1
+        return None
+
+    async def put(self, key, value):
+        created_at = time.time()
+        self._remember(key, value, created_at)
+        self._writes += 1
+        async with db_pool.write() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO ai_cache (kind, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (self.kind, key, json.dumps(value), created_at)
+            )
+            if self._writes % self.PURGE_EVERY == 1:
+                await self._purge(db)
+        self.counters["stores"] += 1
+
+    async def _purge(self, db):
+        if self.ttl is not None:
+            await db.execute("DELETE FROM ai_cache WHERE kind = ? AND created_at < ?", (self.kind, time.time() - self.ttl))
+        if self.max_rows is not None:
+            await db.execute("""
+                DELETE FROM ai_cache WHERE kind = ?1 AND key IN (
+                    SELECT key FROM ai_cache WHERE kind = ?1 ORDER BY created_at DESC LIMIT -1 OFFSET ?2
+                )
+            """, (self.kind, self.max_rows))
+
+    def stats(self):
+        lookups = sum(v for k, v in self.counters.items() if k != "stores")
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {**self.counters, "memory_entries": len(self._memory),
+                "hit_rate": round(hits / lookups, 3) if lookups else None}
+
+parse_cache = ResultCache("parse", memory_size=PARSE_CACHE_MEMORY, ttl=PARSE_CACHE_TTL)
+scan_cache = ResultCache("scan", memory_size=SCAN_CACHE_MEMORY, max_rows=SCAN_CACHE_MAX_ENTRIES)
 
 # ============== Ollama AI Integration ==============
-async def parse_items_with_ai(text):
-    """Use Ollama to parse natural language into individual items."""
-    if not text.strip():
-        return []
+class OllamaBusy(Exception):
+    """Raised when the Ollama queue is full or a request waited too long for a slot."""
+
+class Flight:
+    """One request key in OllamaScheduler.single_flight()."""
+
+    def __init__(self, future, leader):
+        self.leader = leader
+        self._future = future
+
+    def resolve(self, value):
+        """Leader only: hand the result to every follower."""
+        if not self._future.done():
+            self._future.set_result(value)
 
+    async def wait(self):
+        """Follower only: the leader's result, or None if it finished without one.
+
+        Raises whatever the leader raised (OllamaBusy, say).
+        """
+        return await asyncio.shield(self._future)
+
+class OllamaScheduler:
+    """Admission control in front of Ollama.
+
+    At most `slots` requests run at once, and at most limits[model] of them for
+    any one model, so a burst of vision scans can't hold every slot and make
+    Ollama swap models back and forth. Waiting requests start in priority order
+    (lower first, so quick text parses go before scans), then in arrival order.
+    A request that finds queue_size others waiting, or waits longer than
+    queue_timeout seconds, gets OllamaBusy.
+    """
+
+    BACKGROUND_PRIORITY = 99  # model loads and keep-warm pings go after every real request
+
+    def __init__(self, slots=OLLAMA_SLOTS, limits=None, priorities=None,
+                 queue_size=OLLAMA_QUEUE_SIZE, queue_timeout=OLLAMA_QUEUE_TIMEOUT):
+        self.slots = slots
+        self.limits = limits if limits is not None else {
+            OLLAMA_TEXT_MODEL: OLLAMA_TEXT_SLOTS, OLLAMA_VISION_MODEL: OLLAMA_VISION_SLOTS,
+        }
+        self.priorities = priorities if priorities is not None else {OLLAMA_TEXT_MODEL: 0, OLLAMA_VISION_MODEL: 1}
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._running = {}
+        self._waiting = []  # heap of (priority, arrival, model, future)
+        self._arrivals = itertools.count()
+        self._flights = {}
+        self._waits = {}
+        self.counters = {"started": 0, "rejected": 0, "timed_out": 0, "coalesced": 0}
+
+    def _queued(self):
+        return sum(1 for *_, future in self._waiting if not future.done())
+
+    def _dispatch(self):
+        # A waiter held back only by its model's limit doesn't block the ones behind it
+        held = []
+        while self._waiting and sum(self._running.values()) < self.slots:
+            entry = heapq.heappop(self._waiting)
+            model, future = entry[2], entry[3]
+            if future.done():  # gave up waiting
+                continue
+            if self._running.get(model, 0) >= self.limits.get(model, self.slots):
+                held.append(entry)
+                continue
+            self._running[model] = self._running.get(model, 0) + 1
+            future.set_result(None)
+        for entry in held:
+            heapq.heappush(self._waiting, entry)
+
+    def _release(self, model):
+        self._running[model] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model, priority=None):
+        """Wait for a slot to run one request against `model`."""
+        if self._queued() >= self.queue_size:
+            self.counters["rejected"] += 1
+            raise OllamaBusy(f"{self.queue_size} Ollama requests already waiting")
+        if priority is None:
+            priority = self.priorities.get(model, max(self.priorities.values(), default=0) + 1)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._arrivals), model, future))
+        enqueued = time.perf_counter()
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise OllamaBusy(f"waited {self.queue_timeout:g}s for a {model} slot") from None
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self._release(model)
+            raise
+        self.counters["started"] += 1
+        self._waits.setdefault(model, deque(maxlen=200)).append(time.perf_counter() - enqueued)
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    @asynccontextmanager
+    async def single_flight(self, key):
+        """Share one inference among identical requests made while it runs.
+
+        Yields a Flight. The first caller for a key leads: it does the work and
+        calls flight.resolve(result). Callers arriving before it finishes follow
+        and await flight.wait() instead of sending the same request again.
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            yield Flight(future, leader=False)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        flight = Flight(future, leader=True)
+        try:
+            yield flight
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # retrieved, so it is not logged when nobody followed
+            raise
+        finally:
+            del self._flights[key]
+            flight.resolve(None)
+
+    def stats(self):
+        models = {}
+        for model in {*self.limits, *self._running, *self._waits}:
+            waits = sorted(self._waits.get(model, ()))
+            models[model] = {
+                "limit": self.limits.get(model, self.slots),
+                "running": self._running.get(model, 0),
+                "queued": sum(1 for *_, m, f in self._waiting if m == model and not f.done()),
+                "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+                "wait_ms_p95": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else None,
+            }
+        return {"slots": self.slots, "queue_depth": self._queued(), "in_flight": len(self._flights),
+                **self.counters, "models": models}
+
+def parse_hours(spec):
+    """Parse "7-23" into (7, 23); None when empty. The range may wrap midnight
+    ("22-6"); "0-24" means all day."""
+    if not spec.strip():
+        return None
+    start, _, end = spec.partition("-")
+    return int(start) % 24, int(end) % 24
+
+class ModelResidency:
+    """Keeps the Ollama models loaded so requests don't pay for loading them.
+
+    Adds each model's keep_alive to its requests, loads the models in the
+    background at startup, and, within active hours, re-pings any of the warm
+    models idle for a whole interval. Ollama's load_duration on every response tells a
+    cold call (the model had to be loaded) from a warm one; both are timed
+    per model.
+    """
+
+    COLD_LOAD_SECONDS = 0.5  # warm calls still report a few milliseconds of load
+
+    def __init__(self, keep_alive=None, warm_hours=OLLAMA_WARM_HOURS, warm_models=OLLAMA_WARM_MODELS,
+                 warm_interval=OLLAMA_WARM_INTERVAL):
+        self.keep_alive = keep_alive if keep_alive is not None else {
+            OLLAMA_TEXT_MODEL: OLLAMA_TEXT_KEEP_ALIVE, OLLAMA_VISION_MODEL: OLLAMA_VISION_KEEP_ALIVE,
+        }
+        self.warm_hours_spec = warm_hours
+        self.warm_hours = parse_hours(warm_hours)
+        self.warm_models = warm_models
+        self.warm_interval = warm_interval
+        self._models = {}
+
+    def _model(self, model):
+        if model not in self._models:
+            self._models[model] = {
+                "warm": deque(maxlen=200), "cold": deque(maxlen=200),
+                "last_used": None, "load_seconds": None, "preloaded": False, "pings": 0,
+            }
+        return self._models[model]
+
+    def apply(self, payload):
+        """The payload with the model's keep_alive added, unless it sets its own."""
+        keep_alive = self.keep_alive.get(payload["model"])
+        if keep_alive is None or "keep_alive" in payload:
+            return payload
+        return {**payload, "keep_alive": keep_alive}
+
+    def observe(self, model, seconds, load_duration_ns, first_token=None):
+        """Record one finished call: wall time, and Ollama's reported load time.
+
+        A stream closed before Ollama's final chunk has no load_duration; its
+        time to first token, which includes any load, stands in for it.
+        """
+        state = self._model(model)
+        if load_duration_ns is not None:
+            load_seconds = load_duration_ns / 1e9
+        else:
+            load_seconds = first_token or 0.0
+        state["cold" if load_seconds >= self.COLD_LOAD_SECONDS else "warm"].append(seconds)
+        if load_seconds >= self.COLD_LOAD_SECONDS:
+            state["load_seconds"] = load_seconds
+        state["last_used"] = time.monotonic()
+
+    def active_now(self):
+        if self.warm_hours is None:
+            return False
+        start, end = self.warm_hours
+        hour = time.localtime().tm_hour
+        if start == end:
+            return True
+        return start <= hour < end if start < end else hour >= start or hour < end
+
+    async def load(self, client, model):
+        """Ask Ollama to load `model` (a request with no prompt); runs behind real requests."""
+        response = await client.generate({"model": model}, timeout=OLLAMA_LOAD_TIMEOUT,
+                                         priority=OllamaScheduler.BACKGROUND_PRIORITY)
+        response.raise_for_status()
+
+    async def preload(self, client):
+        """Load Bruno's model, then the others, each behind any real request.
+
+        A Bruno request right after a restart waits at most for its own model,
+        and one queued before the vision load starts goes ahead of it. Bruno's
+        model is pinged again at the end (a warm no-op when both fit), so if
+        they don't fit it is the one left loaded.
+        """
+        models = sorted(self.keep_alive, key=lambda m: m != OLLAMA_TEXT_MODEL)
+        if len(models) > 1 and models[0] == OLLAMA_TEXT_MODEL:
+            models.append(OLLAMA_TEXT_MODEL)
+        for model in models:
+            if self._model(model)["preloaded"]:
+                try:
+                    await self.load(client, model)
+                except Exception as e:
+                    print(f"Ollama reload of {model} failed: {e}")
+                continue
+            started = time.perf_counter()
+            try:
+                await self.load(client, model)
+            except Exception as e:
+                print(f"Ollama preload of {model} failed: {e}")
+                continue
+            state = self._model(model)
+            state["preloaded"] = True
+            state["load_seconds"] = time.perf_counter() - started
+            print(f"Ollama model {model} ready in {state['load_seconds']:.1f}s")
+        startup_times["ollama_ready"] = round(time.perf_counter() - STARTED_AT, 3)
+
+    async def keep_warm(self, client):
+        """Run until cancelled, re-pinging idle models during active hours."""
+        while True:
+            await asyncio.sleep(self.warm_interval)
+            if not self.active_now():
+                continue
+            for model in self.warm_models:
+                last_used = self._model(model)["last_used"]
+                if last_used is not None and time.monotonic() - last_used < self.warm_interval:
+                    continue
+                try:
+                    await self.load(client, model)
+                    self._model(model)["pings"] += 1
+                except Exception as e:
+                    print(f"Ollama keep-warm ping of {model} failed: {e}")
+
+    def stats(self):
+        def median(samples):
+            return round(statistics.median(samples), 3) if samples else None
+        models = {}
+        for model in {*self.keep_alive, *self._models}:
+            state = self._model(model)
+            last_used = state["last_used"]
+            models[model] = {
+                "keep_alive": self.keep_alive.get(model),
+                "preloaded": state["preloaded"],
+                "pings": state["pings"],
+                "warm_calls": len(state["warm"]), "warm_s_p50": median(state["warm"]),
+                "cold_calls": len(state["cold"]), "cold_s_p50": median(state["cold"]),
+                "last_load_s": round(state["load_seconds"], 3) if state["load_seconds"] is not None else None,
+                "idle_s": round(time.monotonic() - last_used, 1) if last_used is not None else None,
+            }
+        return {"warm_hours": self.warm_hours_spec or None, "warm_models": self.warm_models,
+                "active_now": self.active_now(), "models": models}
+
+class OllamaClient:
+    """One keep-alive HTTP client to Ollama for the life of the app.
+
+    Every request first takes a slot from the scheduler, and carries its
+    model's keep_alive from the residency manager.
+    """
+
+    def __init__(self, base_url=OLLAMA_URL, max_connections=OLLAMA_MAX_CONNECTIONS,
+                 max_keepalive=OLLAMA_MAX_KEEPALIVE, scheduler=None, residency=None):
+        self.base_url = base_url
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.scheduler = scheduler or OllamaScheduler()
+        self.residency = residency or ModelResidency()
+        self._http = None
+
+    async def open(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.base_url, limits=self.limits)
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _check_open(self):
+        if self._http is None:
+            raise RuntimeError("Ollama client is not open; call ollama.open() first")
+
+    async def generate(self, payload, timeout, priority=None):
+        """POST to /api/generate and return the response."""
+        self._check_open()
+        async with self.scheduler.slot(payload["model"], priority):
+            started = time.perf_counter()
+            response = await self._http.post("/api/generate", json=self.residency.apply(payload), timeout=timeout)
+        if response.status_code == 200 and "prompt" in payload:  # no prompt = just a model load
+            load_duration = response.json().get("load_duration")
+            self.residency.observe(payload["model"], time.perf_counter() - started, load_duration)
+        return response
+
+    async def stream_generate(self, payload, timeout, priority=None):
+        """POST a streaming /api/generate and yield response text fragments as they arrive."""
+        self._check_open()
+        payload = self.residency.apply({**payload, "stream": True})
+        async with self.scheduler.slot(payload["model"], priority):
+            started = time.perf_counter()
+            first_token = load_duration = None
+            try:
+                async with self._http.stream("POST", "/api/generate", json=payload, timeout=timeout) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            load_duration = chunk.get("load_duration")
+                            break
+            finally:
+                if first_token is not None:
+                    self.residency.observe(payload["model"], time.perf_counter() - started, load_duration, first_token)
+
+class JsonArrayStream:
+    """Incrementally parses a JSON array from streamed text.
+
+    feed() takes the next fragment and returns the elements completed by it.
+    Anything before the opening bracket, such as a model preamble, is skipped,
+    as is anything after the closing bracket.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element = []
+
+    def feed(self, fragment):
+        completed = []
+        for ch in fragment:
+            if self.done:
+                break
+            if not self.started:
+                self.started = ch == "["
+                continue
+            if self._in_string:
+                self._element.append(ch)
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+                self._element.append(ch)
+            elif ch in "[{":
+                self._depth += 1
+                self._element.append(ch)
+            elif ch in "]}" and self._depth > 0:
+                self._depth -= 1
+                self._element.append(ch)
+            elif ch == "]":
+                self._emit(completed)
+                self.done = True
+            elif ch == "," and self._depth == 0:
+                self._emit(completed)
+            else:
+                self._element.append(ch)
+        return completed
+
+    def _emit(self, completed):
+        text = "".join(self._element).strip()
+        self._element = []
+        if text:
+            try:
+                completed.append(json.loads(text))
+            except ValueError:
+                pass
+
+ollama = OllamaClient()
+
+# ============== Parsed Items ==============
+# Bruno and Smart Scan produce typed items: {"name": "Eggs", "quantity": 2, "unit": "dozen"},
+# with quantity and unit None when the text gives none.
+# Structured replies are a bare array of strings ("2 dozen Eggs"): per-item
+# objects cost more generated tokens than they save, so amounts are read from
+# each string with the rule parser's amount reader instead
+ITEMS_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+MAX_QUANTITY = 10000  # larger amounts are misreads, and must fit an SQLite INTEGER
+
+def typed_item(value):
+    """Coerce a model's item (a string like "2 dozen Eggs", or an object) to a typed item; None if it has no name."""
+    if isinstance(value, dict):
+        name = str(value.get("name") or "").strip()
+        quantity = value.get("quantity")
+        unit = str(value.get("unit") or "").strip() or None
+    else:
+        item = amount_item(str(value).strip(), drop_article=False)
+        if item is not None and item["name"]:
+            return item
+        name, quantity, unit = str(value).strip(), None, None
+    if not name:
+        return None
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or not 0 < quantity <= MAX_QUANTITY:
+        quantity = unit = None
+    elif float(quantity).is_integer():
+        quantity = int(quantity)
+    return {"name": name, "quantity": quantity, "unit": unit}
+
+def typed_items(values):
+    return [item for item in map(typed_item, values) if item is not None]
+
+class PartialItems(list):
+    """Items from a model reply that stopped before it finished (timeout, dropped
+    connection, token cap), so more may be missing. Never cached or shared."""
+
+def item_amount(item):
+    if item["quantity"] is None:
+        return ""
+    return f"{item['quantity']:g} {item['unit']}" if item["unit"] else f"{item['quantity']:g}"
+
+def item_label(item):
+    """How a parsed item reads in the pick list: "2 dozen Eggs"."""
+    item = typed_item(item)
+    amount = item_amount(item)
+    return f"{amount} {item['name']}" if amount else item["name"]
+
+def item_entry(item):
+    """The (name, quantity) a parsed item is added to a list as.
+
+    A whole count becomes the item's quantity; an amount with a unit stays
+    in the name ("Chicken (1.5 lb)"), since lists count items, not pounds.
+    """
+    item = typed_item(item)
+    if item["quantity"] is None:
+        return item["name"], 1
+    if item["unit"] is None and isinstance(item["quantity"], int):
+        return item["name"], item["quantity"]
+    return f"{item['name']} ({item_amount(item)})", 1
+
+def decode_items(result):
+    """Typed items from a model reply: a schema object, a bare array, or an array inside prose.
+
+    Returns (items, complete); complete is False when the array was cut off.
+    """
+    complete = True
+    try:
+        data = json.loads(result)
+    except ValueError:
+        # Prose around the array, or a reply cut off at num_predict: keep the complete elements
+        parser = JsonArrayStream()
+        data = parser.feed(result)
+        complete = parser.done
+    if isinstance(data, dict):
+        data = data.get("items") or []
+    return (typed_items(data) if isinstance(data, list) else []), complete
+
+def parse_token_budget(text):
+    """num_predict for a Bruno parse: room for one typed item per word, plus the wrapper."""
+    return min(OLLAMA_NUM_PREDICT_MAX, 24 + 16 * len(text.split()))
+
+# Bump when the parse prompt changes so cached results from the old prompt are not reused
+PARSE_PROMPT_VERSION = 3
+
+def parse_request(text):
+    """The Ollama payload for a Bruno parse, structured or free-form."""
+    if OLLAMA_STRUCTURED:
+        prompt = f"""List each distinct grocery or task item in this text as a JSON array of strings. Capitalize names, drop filler words, and put any amount first ("2 dozen Eggs").
+
+Text: {text}"""
+        return {"model": OLLAMA_TEXT_MODEL, "prompt": prompt, "format": ITEMS_SCHEMA,
+                "options": {"num_predict": parse_token_budget(text)}}
     prompt = f"""Extract individual grocery/task items from this text. Return ONLY a JSON array of strings, nothing else.
 
 Text: "{text}"
@@ -152,47 +1538,279 @@ Example input: "need milk eggs and oh yeah we're out of bread also bananas"
 Example output: ["Milk", "Eggs", "Bread", "Bananas"]
 
 Your response (JSON array only):"""
-
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "http://localhost:11434/api/generate",
-                json={"model": "qwen2.5:7b-instruct", "prompt": prompt, "stream": False}
-            )
-            if response.status_code == 200:
-                result = response.json().get("response", "").strip()
-                # Try to extract JSON array from response
-                start = result.find("[")
-                end = result.rfind("]") + 1
-                if start != -1 and end > start:
-                    json_str = result[start:end]
-                    items = json.loads(json_str)
-                    return [str(item).strip() for item in items if item]
-    except Exception as e:
-        print(f"Ollama error: {e}")
-
-    # Fallback: simple split on common delimiters
-    fallback_items = []
-    for delimiter in [",", " and ", "\n"]:
-        if delimiter in text:
-            parts = text.split(delimiter)
-            fallback_items = [p.strip() for p in parts if p.strip()]
+    return {"model": OLLAMA_TEXT_MODEL, "prompt": prompt}
+
+# ============== Bruno Parsing ==============
+# Rule tier: split on list punctuation and joining words, drop filler phrases,
+# and read a leading amount ("2 dozen", "a loaf of", "1 1/2 lb"). Its
+# confidence is the score of its least plausible item.
+UNITS = {
+    alias: unit
+    for spec in (
+        "dozen lb:lbs,pound,pounds oz:ounce,ounces kg:kgs,kilo,kilos g:gram,grams l:liter,liters,litre,litres "
+        "ml gallon:gallons,gal quart:quarts pint:pints cup:cups tbsp:tablespoon,tablespoons "
+        "tsp:teaspoon,teaspoons can:cans jar:jars bag:bags box:boxes bottle:bottles pack:packs,package,packages "
+        "bunch:bunches loaf:loaves carton:cartons head:heads clove:cloves stick:sticks bar:bars roll:rolls "
+        "slice:slices"
+    ).split()
+    for unit, _, aliases in [spec.partition(":")]
+    for alias in [unit, *filter(None, aliases.split(","))]
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "a couple of": 2, "a couple": 2, "half a": 0.5, "half an": 0.5,
+    "a": 1, "an": 1,
+}
+FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+FILLERS = (
+    "oh yeah", "oh and", "oh", "um", "uh", "i think", "i guess", "also", "and", "plus", "then", "please", "i need to get", "i need to buy",
+    "i need", "we need", "need to get", "need to buy", "need", "don't forget to get", "don't forget the",
+    "don't forget", "remember to get", "remember to buy", "we're out of", "we are out of", "were out of",
+    "out of", "get me", "get", "buy", "grab", "pick up", "some", "a few", "a bit of", "a little", "more", "the",
+)
+# Dishes and products whose "and" is part of the name
+COMPOUNDS = (
+    "mac and cheese", "macaroni and cheese", "salt and pepper", "half and half", "peanut butter and jelly",
+    "fish and chips", "cookies and cream", "sour cream and onion", "chips and salsa", "rice and beans",
+)
+# Words that mean a split left part of a sentence behind
+PROSE_WORDS = frozenset(
+    "i we you they he she it is are was were be been to for if but so because that this think should would "
+    "could will want wants maybe probably tonight tomorrow dinner lunch breakfast recipe make making cook "
+    "cooking forgot got have has had yeah oh um uh like".split()
+)
+
+SEPARATOR_RE = re.compile(r"\s*[,;]\s*")
+JOINER_RE = re.compile(r"\s+(?:and|&|plus|also|then)\s+", re.IGNORECASE)
+# Score cap for items split at a joining word: "oil and vinegar" is two items,
+# "sweet and sour sauce" is one, and only the model can tell them apart
+JOINED_SCORE = 0.6
+BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+FILLER_RE = re.compile(
+    r"^(?:" + "|".join(re.escape(f) for f in sorted(FILLERS, key=len, reverse=True)) + r")\b[\s,:]*", re.IGNORECASE
+)
+TRAILING_FILLER_RE = re.compile(r"\s+(?:too|as well|please|also|again|i think|i guess)$", re.IGNORECASE)
+AMOUNT_RE = re.compile(
+    r"^(?P<amount>\d+(?:\.\d+)?(?:\s+\d/\d)?|\d/\d|[½¼¾⅓⅔]|"
+    + "|".join(re.escape(w) for w in sorted(NUMBER_WORDS, key=len, reverse=True))
+    + r")\s+(?P<rest>.+)$",
+    re.IGNORECASE,
+)
+TIMES_RE = re.compile(r"\s*(?:\bx\s*(\d+)|\((\d+)\))$", re.IGNORECASE)
+
+def parse_amount(text):
+    """The number an amount spells; None for "1/0" or anything over MAX_QUANTITY."""
+    text = text.lower()
+    if text in NUMBER_WORDS:
+        return NUMBER_WORDS[text]
+    if text in FRACTIONS:
+        return FRACTIONS[text]
+    whole, _, fraction = text.partition(" ")
+    if "/" in whole:
+        whole, fraction = "0", whole
+    value = float(whole)
+    if fraction:
+        numerator, denominator = fraction.split("/")
+        if int(denominator) == 0:
+            return None
+        value += int(numerator) / int(denominator)
+    return value if value <= MAX_QUANTITY else None
+
+def rule_item(segment):
+    """A typed item from one split segment (None if nothing is left of it)."""
+    text = segment.strip().strip(".!?").strip()
+    while (stripped := FILLER_RE.sub("", text, count=1)) != text:
+        text = stripped
+    return amount_item(TRAILING_FILLER_RE.sub("", text).strip())
+
+def amount_item(text, drop_article=True):
+    """A typed item from item text with a leading amount or trailing "x 3".
+
+    None if the text is empty. A bare amount is returned with an empty name so
+    it can be scored, as is an amount that cannot be right ("1/0 apples").
+    With drop_article=False, "A Tale of Two Cities" keeps its "A".
+    """
+    original = text
+    quantity = unit = None
+    times = TIMES_RE.search(text)
+    amount = None if times else AMOUNT_RE.match(text)
+    if times:
+        quantity = parse_amount(times.group(1) or times.group(2))
+        text = text[:times.start()]
+    elif amount:
+        word = amount.group("amount").lower()
+        quantity, text = parse_amount(word), amount.group("rest")
+    if (times or amount) and quantity is None:
+        return {"name": "", "quantity": None, "unit": None}  # "1/0 apples": scores 0.0
+    if amount:
+        first, _, rest = text.partition(" ")
+        if first.lower().rstrip(".") in UNITS and rest:
+            unit = UNITS[first.lower().rstrip(".")]
+            text = rest[3:] if rest.lower().startswith("of ") else rest
+        elif first.lower().rstrip(".") in UNITS:
+            unit, text = UNITS[first.lower().rstrip(".")], ""
+        elif word in ("a", "an"):
+            quantity = None  # "an apple" is just an apple
+            text = text if drop_article else original
+    text = text.strip()
+    if not text and quantity is None:
+        return None
+    item = {"name": text[:1].upper() + text[1:], "quantity": quantity, "unit": unit}
+    return typed_item(item) if text else item  # a bare amount is kept so it can be scored
+
+def rule_item_score(item, listed):
+    """How plausible one item is; `listed` says the input used list punctuation."""
+    name = item["name"].lower()
+    words = name.split()
+    if len(name) < 2 or not re.search(r"[^\W\d_]", name):
+        return 0.0  # an amount or unit left on its own: the split cut through an item
+    if name in UNITS or name in NUMBER_WORDS:
+        return 0.2
+    if PROSE_WORDS.intersection(words) or len(words) > 5:
+        return 0.4
+    if not listed and len(words) > 2:
+        return 0.6  # "milk eggs bread" may be one item or three
+    if not listed and len(words) == 2:
+        return 0.9  # a two-word phrase on its own is usually one item: "olive oil", "call mom"
+    return 1.0
+
+def rule_parse(text):
+    """Split text into typed items without a model. Returns (items, confidence)."""
+    lines = [BULLET_RE.sub("", line) for line in text.strip().splitlines()]
+    listed = len([line for line in lines if line.strip()]) > 1 or bool(re.search(r"[,;]", text))
+    items, scores, seen = [], [], set()
+    for line in lines:
+        for compound in COMPOUNDS:
+            line = re.sub(re.escape(compound), compound.replace(" and ", "\x00"), line, flags=re.IGNORECASE)
+        for part in SEPARATOR_RE.split(line):
+            segments = JOINER_RE.split(part)
+            for segment in segments:
+                item = rule_item(segment.replace("\x00", " and "))
+                if item is None:
+                    continue
+                score = rule_item_score(item, listed)
+                scores.append(min(score, JOINED_SCORE) if len(segments) > 1 else score)
+                key = item_key(item["name"])
+                if item["name"] and key not in seen:
+                    seen.add(key)
+                    items.append(item)
+    return items, (min(scores) if items else 0.0)
+
+
+async def parse_items_stream(text):
+    """Use Ollama to parse natural language into individual items, streaming.
+
+    Yields the growing list of typed items each time the model completes one,
+    so the UI can show them as they arrive. If the reply stops before it is
+    complete, the last list is a PartialItems. Falls back to the rule parser if
+    the model is unavailable or returns nothing usable.
+    """
+    if not text.strip():
+        return
+
+    cache_key = ResultCache.key(OLLAMA_TEXT_MODEL, PARSE_PROMPT_VERSION, OLLAMA_STRUCTURED, normalize_text(text))
+    cached = await parse_cache.get(cache_key)
+    if cached is not None:
+        yield list(cached)
+        return
+
+    while True:
+        async with ollama.scheduler.single_flight(cache_key) as flight:
+            if not flight.leader:
+                # The same text is already being parsed; wait for that result.
+                # None means the leader's reply was cut off, so parse it again.
+                items = await flight.wait()
+                if items is None:
+                    continue
+                if items:
+                    yield list(items)
+                    return
+                break
+            items = []
+            started = time.perf_counter()
+            first_item_at = None
+            parser = JsonArrayStream()
+            try:
+                # aclosing: stopping at the closing bracket frees the Ollama slot right away
+                async with aclosing(ollama.stream_generate(parse_request(text), timeout=OLLAMA_TEXT_TIMEOUT)) as fragments:
+                    async for fragment in fragments:
+                        new_items = typed_items(parser.feed(fragment))
+                        if new_items:
+                            if first_item_at is None:
+                                first_item_at = time.perf_counter() - started
+                            items.extend(new_items)
+                            yield list(items)
+                        if parser.done:
+                            break
+            except Exception as e:
+                print(f"Ollama error: {e}")
+
+            if items and parser.done:
+                print(f"Bruno parse: {len(items)} items, first after {first_item_at:.2f}s, total {time.perf_counter() - started:.2f}s")
+                flight.resolve(items)
+                await parse_cache.put(cache_key, items)
+                return
+            if items:
+                print(f"Bruno parse: cut off after {len(items)} items, total {time.perf_counter() - started:.2f}s")
+                yield PartialItems(items)
+                return
+            flight.resolve([])  # nothing usable: followers fall back to the rules as well
             break
-    if not fallback_items:
-        fallback_items = [text.strip()]
-    return fallback_items
+
+    # Fallback: whatever the rule parser makes of it
+    yield rule_parse(text)[0] or typed_items([text])
+
+async def parse_items_with_ai(text):
+    """Use Ollama to parse natural language into individual typed items."""
+    items = []
+    async for items in parse_items_stream(text):
+        pass
+    return items
+
+# Parses answered by each tier and the time they took, served at /stats
+parse_tier_stats = {"rules": 0, "model": 0, "rules_seconds": 0.0, "model_seconds": 0.0}
+
+async def parse_items_tiered(text):
+    """Bruno's parse: the rule parser when it is confident, otherwise the model.
+
+    Yields the growing list of typed items, like parse_items_stream.
+    """
+    started = time.perf_counter()
+    items, confidence = rule_parse(text)
+    if items and confidence >= PARSE_RULE_CONFIDENCE:
+        elapsed = time.perf_counter() - started
+        parse_tier_stats["rules"] += 1
+        parse_tier_stats["rules_seconds"] += elapsed
+        print(f"Bruno parse: rules tier, {len(items)} items, confidence {confidence:.2f}, {elapsed * 1e6:.0f} µs")
+        yield items
+        return
+    async for items in parse_items_stream(text):
+        yield items
+    elapsed = time.perf_counter() - started
+    parse_tier_stats["model"] += 1
+    parse_tier_stats["model_seconds"] += elapsed
+    print(f"Bruno parse: model tier (rule confidence {confidence:.2f}), {len(items)} items, {elapsed:.2f} s")
 
 # ============== Vision Model Integration ==============
-async def extract_items_from_image(image_path, list_type):
-    """Use Ollama vision model to extract items from an image."""
-    if image_path is None:
-        return []
+# Bump when the scan prompts change so cached results from the old prompts are not reused
+SCAN_PROMPT_VERSION = 3
+
+# What Smart Scan looks for, by list type
+SCAN_SUBJECTS = {
+    "Shopping": "shopping items, ingredients or groceries",
+    "To Do": "tasks or action items",
+    "Chores": "chores, cleaning or household tasks",
+}
 
-    # Read and encode image as base64
-    with open(image_path, "rb") as f:
-        image_data = base64.b64encode(f.read()).decode("utf-8")
+def scan_request(list_type, image_data):
+    """The Ollama payload for one Smart Scan page, structured or free-form."""
+    if OLLAMA_STRUCTURED:
+        subject = SCAN_SUBJECTS.get(list_type, SCAN_SUBJECTS["Shopping"])
+        prompt = (f"List every one of the {subject} in this image (a recipe, note, whiteboard or screenshot) "
+                  'as a JSON array of strings. Capitalize names and put any amount first ("2 dozen Eggs").')
+        return {"model": OLLAMA_VISION_MODEL, "prompt": prompt, "images": [image_data], "stream": False,
+                "format": ITEMS_SCHEMA, "options": {"num_predict": OLLAMA_NUM_PREDICT_MAX}}
 
-    # Craft prompt based on list type
     type_prompts = {
         "Shopping": "Look at this image carefully. Extract all shopping items, ingredients, groceries, or things to buy. This could be a recipe, handwritten note, whiteboard, screenshot, or any image containing items to purchase.",
         "To Do": "Look at this image carefully. Extract all tasks, to-do items, action items, or things that need to be done. This could be a handwritten note, whiteboard, screenshot, or any image containing tasks.",
@@ -206,42 +1824,393 @@ Return ONLY a JSON array of strings with each item, nothing else. Clean up the t
 Example output: ["Milk", "2 dozen eggs", "Bread", "Butter"]
 
 Your response (JSON array only):"""
+    return {"model": OLLAMA_VISION_MODEL, "prompt": prompt, "images": [image_data], "stream": False}
 
+# Running totals for the image preprocessing stage, served at /stats
+scan_image_stats = {"images": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+
+def preprocess_scan_image(image_bytes, grayscale=False, max_edge=SCAN_MAX_EDGE, fmt=SCAN_FORMAT, quality=SCAN_QUALITY):
+    """Shrink an upload before vision inference.
+
+    Applies the EXIF rotation, then drops all metadata, caps the long edge at
+    max_edge, optionally converts to grayscale, and re-encodes. Returns the
+    original bytes if they cannot be decoded, or if re-encoding a color image
+    would make it larger.
+    """
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                "http://localhost:11434/api/generate",
-                json={
-                    "model": "qwen3-vl:8b",
-                    "prompt": prompt,
-                    "images": [image_data],
-                    "stream": False
-                }
-            )
-            if response.status_code == 200:
-                result = response.json().get("response", "").strip()
-                print(f"Vision model response: {result[:500]}")
-                # Try to extract JSON array from response
-                start = result.find("[")
-                end = result.rfind("]") + 1
-                if start != -1 and end > start:
-                    json_str = result[start:end]
-                    items = json.loads(json_str)
-                    return [str(item).strip() for item in items if item]
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            scale = min(1.0, max_edge / max(img.size))
+            img.draft("RGB", (int(img.width * scale), int(img.height * scale)))  # JPEG: decode at reduced scale
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            if grayscale:
+                img = img.convert("L")
+            elif img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format=fmt, quality=quality)
     except Exception as e:
-        print(f"Vision model error: {e}")
+        print(f"Scan image preprocessing skipped: {e}")
+        return image_bytes
+    encoded = out.getvalue()
+    if len(encoded) >= len(image_bytes) and not grayscale:
+        return image_bytes
+    return encoded
+
+async def extract_items_from_image(image_path, list_type, grayscale=False):
+    """Use Ollama vision model to extract typed items from an image.
+
+    Returns a PartialItems if the reply was cut off. Raises OllamaBusy if the
+    scheduler refuses the request, for callers sharing it as well.
+    """
+    if image_path is None:
+        return []
+
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
 
-    return []
+    # Same picture, same list type, same prompt and preprocessing: reuse the earlier extraction
+    cache_key = ResultCache.key(
+        OLLAMA_VISION_MODEL, SCAN_PROMPT_VERSION, OLLAMA_STRUCTURED, list_type, hashlib.sha256(image_bytes).hexdigest(),
+        grayscale, SCAN_MAX_EDGE, SCAN_FORMAT, SCAN_QUALITY
+    )
+    cached = await scan_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    started = time.perf_counter()
+    processed = await asyncio.to_thread(preprocess_scan_image, image_bytes, grayscale)
+    elapsed = time.perf_counter() - started
+    scan_image_stats["images"] += 1
+    scan_image_stats["bytes_in"] += len(image_bytes)
+    scan_image_stats["bytes_out"] += len(processed)
+    scan_image_stats["seconds"] += elapsed
+    print(f"Scan image: {len(image_bytes) / 1024:.0f} KB -> {len(processed) / 1024:.0f} KB in {elapsed * 1000:.0f} ms")
+
+    image_data = base64.b64encode(processed).decode("utf-8")
+
+    payload = scan_request(list_type, image_data)
+
+    while True:
+        async with ollama.scheduler.single_flight(cache_key) as flight:
+            if not flight.leader:
+                # The same page is already being scanned; wait for that result.
+                # None means the leader's reply was cut off, so scan it again.
+                items = await flight.wait()
+                if items is None:
+                    continue
+                return list(items)
+            try:
+                response = await ollama.generate(payload, timeout=OLLAMA_VISION_TIMEOUT)
+                if response.status_code == 200:
+                    result = response.json().get("response", "").strip()
+                    print(f"Vision model response: {result[:500]}")
+                    items, complete = decode_items(result)
+                    if items and not complete:
+                        print(f"Vision model reply cut off after {len(items)} items")
+                        return PartialItems(items)
+                    flight.resolve(items)
+                    if items:
+                        await scan_cache.put(cache_key, items)
+                    return items
+            except OllamaBusy:
+                raise
+            except Exception as e:
+                print(f"Vision model error: {e}")
+            flight.resolve([])
+            return []
+
+async def extract_items_from_images(image_paths, list_type, grayscale=False, concurrency=SCAN_CONCURRENCY):
+    """Extract items from several images, at most `concurrency` at a time.
+
+    Yields (pages_done, items) as each page finishes. Items are de-duplicated
+    across pages by item_key, the key inserts merge on, keeping the first
+    spelling seen; they are a PartialItems once any page's reply was cut off.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(image_path):
+        async with semaphore:
+            return await extract_items_from_image(image_path, list_type, grayscale)
+
+    tasks = [asyncio.ensure_future(extract(path)) for path in image_paths]
+    items = []
+    seen = set()
+    partial = False
+    try:
+        for pages_done, page in enumerate(asyncio.as_completed(tasks), start=1):
+            page_items = await page
+            partial = partial or isinstance(page_items, PartialItems)
+            for item in page_items:
+                key = item_key(item["name"])
+                if key not in seen:
+                    seen.add(key)
+                    items.append(item)
+            yield pages_done, PartialItems(items) if partial else list(items)
+    finally:
+        for task in tasks:
+            task.cancel()
 
 # ============== Audio Transcription ==============
-def transcribe_audio(audio_path):
+class WhisperManager:
+    """Loads the Whisper model in a background thread, off the request path.
+
+    get() returns the model once it is loaded; until then it returns None and
+    makes sure a load is under way, so callers can report "warming up".
+    """
+
+    def __init__(self, name, device="cpu"):
+        self.name = name
+        self.device = device
+        self.error = None
+        self.load_seconds = None
+        self._model = None
+        self._loader = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def preload(self):
+        """Start loading the model if it is not loaded or loading already."""
+        with self._lock:
+            if self._model is None and self._loader is None:
+                self._loader = threading.Thread(target=self._load, name="whisper-loader", daemon=True)
+                self._loader.start()
+
+    def get(self):
+        if self._model is None:
+            self.preload()
+        return self._model
+
+    def _load(self):
+        print(f"Loading Whisper model {self.name}...")
+        started = time.perf_counter()
+        try:
+            import whisper
+            model = whisper.load_model(self.name, device=self.device)
+        except Exception as e:
+            print(f"Whisper load error: {e}")
+            with self._lock:
+                self.error = str(e)
+                self._loader = None  # let the next get() retry
+            return
+        with self._lock:
+            self._model = model
+            self.error = None
+            self.load_seconds = time.perf_counter() - started
+            self._loader = None
+        startup_times["whisper_ready"] = round(time.perf_counter() - STARTED_AT, 3)
+        print(f"Whisper model loaded in {self.load_seconds:.1f}s")
+
+    def stats(self):
+        load_seconds = round(self.load_seconds, 3) if self.load_seconds is not None else None
+        return {"model": self.name, "ready": self.ready, "load_seconds": load_seconds, "error": self.error}
+
+whisper_manager = WhisperManager(WHISPER_MODEL)
+
+AUDIO_SAMPLE_RATE = 16000  # what Whisper works on
+AUDIO_FRAME_SECONDS = 0.03
+AUDIO_HANGOVER_SECONDS = 0.2  # kept around speech so word onsets and trailing consonants survive
+
+# Running totals for the audio preprocessing stage, served at /stats
+audio_stats = {"recordings": 0, "no_speech": 0, "seconds_in": 0.0, "seconds_removed": 0.0, "seconds": 0.0}
+audio_stats_lock = threading.Lock()
+
+def decode_audio(audio_path):
+    """Decode a recording to 16 kHz mono float32 samples, Whisper's input format."""
+    from whisper.audio import load_audio
+    return load_audio(audio_path, sr=AUDIO_SAMPLE_RATE)
+
+def speech_frames(audio, sample_rate=AUDIO_SAMPLE_RATE):
+    """Energy-based voice activity: one flag per 30 ms frame.
+
+    A frame is speech when it is 12 dB louder than the recording's noise
+    floor (its quietest tenth), or within 15 dB of its loudest frame when
+    there is no quiet stretch to measure the floor from, and above -50 dBFS.
+    A recording whose level barely varies (silence, a steady hum) has no
+    speech. Returns the flags, widened by the hangover, and the number of raw
+    speech frames.
+    """
+    frame = int(sample_rate * AUDIO_FRAME_SECONDS)
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=bool), 0
+    frames = audio[:count * frame].reshape(count, frame).astype(np.float64)
+    level = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+    floor, peak = np.percentile(level, 10), level.max()
+    if peak - floor < 6:
+        return np.zeros(count, dtype=bool), 0
+    voiced = level > max(min(floor + 12, peak - 15), -50)
+    hangover = int(AUDIO_HANGOVER_SECONDS / AUDIO_FRAME_SECONDS)
+    widened = np.convolve(voiced, np.ones(2 * hangover + 1), "same") > 0
+    return widened, int(voiced.sum())
+
+def trim_silence(audio, max_pause=AUDIO_MAX_PAUSE, min_speech=AUDIO_MIN_SPEECH, sample_rate=AUDIO_SAMPLE_RATE):
+    """Drop leading and trailing silence and shorten long pauses.
+
+    Returns None when the recording holds less than min_speech seconds of
+    speech.
+    """
+    keep, spoken = speech_frames(audio, sample_rate)
+    if spoken * AUDIO_FRAME_SECONDS < min_speech:
+        return None
+    # Runs of silent frames: keep max_pause of each pause between words,
+    # split across its two ends, and none of the silence at either edge
+    edges = np.diff(np.concatenate(([1], keep, [1])).astype(np.int8))
+    pause_frames = int(max_pause / AUDIO_FRAME_SECONDS)
+    head = pause_frames // 2
+    for start, end in zip(np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)):
+        if start == 0 or end == len(keep):
+            continue
+        if end - start <= pause_frames:
+            keep[start:end] = True
+        else:
+            keep[start:start + head] = True
+            keep[end - (pause_frames - head):end] = True
+    frame = int(sample_rate * AUDIO_FRAME_SECONDS)
+    return audio[:len(keep) * frame].reshape(len(keep), frame)[keep].ravel()
+
+def prepare_audio(audio_path, trim=AUDIO_TRIM):
+    """Decode a recording once and trim it for Whisper; None when there is no speech."""
+    started = time.perf_counter()
+    audio = decode_audio(audio_path)
+    prepared = trim_silence(audio) if trim else audio
+    seconds_in = len(audio) / AUDIO_SAMPLE_RATE
+    seconds_out = 0.0 if prepared is None else len(prepared) / AUDIO_SAMPLE_RATE
+    with audio_stats_lock:
+        audio_stats["recordings"] += 1
+        audio_stats["no_speech"] += prepared is None
+        audio_stats["seconds_in"] += seconds_in
+        audio_stats["seconds_removed"] += seconds_in - seconds_out
+        audio_stats["seconds"] += time.perf_counter() - started
+    if prepared is None:
+        print(f"Audio: {seconds_in:.1f}s, no speech found, skipping Whisper")
+    else:
+        print(f"Audio: {seconds_in:.1f}s -> {seconds_out:.1f}s after trimming silence")
+    return prepared
+
+class TranscriptionBusy(Exception):
+    """Raised when the transcription queue is full."""
+
+class TranscriptionPool:
+    """Runs Whisper jobs on a bounded pool of worker threads.
+
+    Whisper installs decoder hooks on the model for the length of a call, so
+    each worker transcribes with its own model: the first uses the loaded one,
+    the others a copy of it. Jobs beyond
+    workers + queue_size are rejected instead of piling up.
+    """
+
+    def __init__(self, workers=TRANSCRIBE_WORKERS, queue_size=TRANSCRIBE_QUEUE_SIZE,
+                 timeout=TRANSCRIBE_TIMEOUT, torch_threads=TRANSCRIBE_TORCH_THREADS):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        self._executor = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._model_shared = False
+        self._latencies = deque(maxlen=200)
+        self._waits = deque(maxlen=200)
+        self.counters = {"completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+
+    def _init_worker(self):
+        import torch
+        torch.set_num_threads(self.torch_threads)
+
+    def _run(self, model, audio_path, enqueued):
+        """Preprocess the recording and transcribe it, unless it holds no speech."""
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        try:
+            audio = prepare_audio(audio_path)
+            if audio is None:
+                return {"text": ""}, started - enqueued
+            if getattr(self._local, "model", None) is None:
+                # The first worker takes the loaded model; only the others copy it
+                with self._lock:
+                    shared, self._model_shared = self._model_shared, True
+                self._local.model = copy.deepcopy(model) if shared else model
+            return self._local.model.transcribe(audio), started - enqueued
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _job_done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def transcribe(self, model, audio_path):
+        """Queue a transcription and wait for it without blocking the event loop."""
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self.counters["rejected"] += 1
+                raise TranscriptionBusy(f"{self._pending} recordings already waiting")
+            self._pending += 1
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="transcribe", initializer=self._init_worker
+            )
+        enqueued = time.perf_counter()
+        future = self._executor.submit(self._run, model, audio_path, enqueued)
+        future.add_done_callback(self._job_done)
+        try:
+            result, waited = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        self.counters["completed"] += 1
+        self._waits.append(waited)
+        self._latencies.append(time.perf_counter() - enqueued)
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        def percentile(p):
+            return round(latencies[int(p * (len(latencies) - 1))], 3) if latencies else None
+        with self._lock:
+            running, pending = self._running, self._pending
+        return {
+            "workers": self.workers,
+            "torch_threads": self.torch_threads,
+            "running": running,
+            "queue_depth": pending - running,
+            **self.counters,
+            "wait_s_avg": round(sum(self._waits) / len(self._waits), 3) if self._waits else None,
+            "latency_s_p50": percentile(0.5),
+            "latency_s_p95": percentile(0.95),
+        }
+
+transcription_pool = TranscriptionPool()
+
+async def transcribe_audio(audio_path):
     """Transcribe audio file using Whisper model."""
     if audio_path is None:
         return "", '<div class="status-msg status-error">No audio recorded.</div>'
 
+    whisper_model = whisper_manager.get()
+    if whisper_model is None:
+        if whisper_manager.error:
+            return "", f'<div class="status-msg status-error">Speech model failed to load: {whisper_manager.error}</div>'
+        return "", '<div class="status-msg status-info">Speech model warming up, try again in a few seconds.</div>'
+
     print(f"Transcribing file: {audio_path}")
     try:
-        result = whisper_model.transcribe(audio_path)
+        result = await transcription_pool.transcribe(whisper_model, audio_path)
         text = result["text"].strip()
         print(f"Transcription result: {text}")
 
@@ -249,157 +2218,181 @@ def transcribe_audio(audio_path):
             return text, '<div class="status-msg status-success">✓ Transcription complete!</div>'
         else:
             return "", '<div class="status-msg status-error">No speech detected.</div>'
+    except TranscriptionBusy:
+        return "", '<div class="status-msg status-error">Too many recordings in progress, try again shortly.</div>'
+    except asyncio.TimeoutError:
+        return "", '<div class="status-msg status-error">Transcription timed out.</div>'
     except Exception as e:
         print(f"Error: {e}")
         return "", f'<div class="status-msg status-error">Error: {str(e)}</div>'
 
-def smart_split_text(text):
-    """Split text by commas, 'and', and newlines into individual items."""
-    import re
-    # First split by newlines
-    lines = text.strip().split('\n')
-    items = []
-    filler_pattern = re.compile(r'^(also|oh yeah|we need|need|get|buy|grab|the)\s+', re.IGNORECASE)
-    for line in lines:
-        # Split by comma or ' and ' (with spaces to avoid splitting 'sand', 'band', etc.)
-        parts = re.split(r',|\s+and\s+', line, flags=re.IGNORECASE)
-        for part in parts:
-            cleaned = part.strip()
-            # Remove common filler words at the start (loop to handle chained fillers)
-            while filler_pattern.match(cleaned):
-                cleaned = filler_pattern.sub('', cleaned)
-            if cleaned and len(cleaned) > 1:  # Skip empty or single-char items
-                items.append(cleaned)
-    return items
-
 # ============== HTML Generators ==============
-def generate_all_lists_html(lists, items_dict):
-    if not lists:
-        return """
-        <div style="text-align: center; padding: 60px 20px; color: #666;">
-            <div style="font-size: 48px; margin-bottom: 16px;">📝</div>
-            <p style="font-size: 18px; margin: 0;">No lists yet!</p>
-            <p style="font-size: 14px; color: #999;">Create your first list below.</p>
-        </div>
-        """
-
-    html = '<div style="display: flex; flex-direction: column; gap: 12px; padding: 16px;">'
-
-    for lst in lists:
-        list_id = lst['id']
-        list_name = lst['name']
-        list_type = lst['list_type']
-        items = items_dict.get(list_id, [])
-
-        type_icons = {"Shopping": "🛒", "To Do": "✅", "Chores": "🏠"}
-        icon = type_icons.get(list_type, "📋")
+# Rendering: each row template is a single f-string compiled once with its
+# function, and a view is built by joining the rows in one pass. Styling lives
+# in custom_css, so the payload only carries structure and (escaped) text.
+LIST_TYPE_ICONS = {"Shopping": "🛒", "To Do": "✅", "Chores": "🏠"}
+
+EMPTY_LISTS_HTML = (
+    '<div class="empty-state no-lists"><div class="empty-icon">📝</div>'
+    '<p class="empty-title">No lists yet!</p><p class="empty-hint">Create your first list below.</p></div>'
+)
+PREVIEW_DONE_HTML = '<div class="preview-done">✓ All items completed!</div>'
+PREVIEW_EMPTY_HTML = '<div class="preview-empty">No items yet</div>'
+
+def render_list_card(lst, preview_names):
+    list_id = lst['id']
+    open_count = lst['open_count']
+    if open_count:
+        preview = "".join([
+            f'<div class="preview-row"><span class="preview-dot">●</span><span>{escape(name, False)}</span></div>'
+            for name in preview_names
+        ])
+        if open_count > len(preview_names):
+            preview += f'<div class="preview-more">+ {open_count - len(preview_names)} more items</div>'
+    else:
+        preview = PREVIEW_DONE_HTML if lst['has_items'] else PREVIEW_EMPTY_HTML
+    return (
+        f'<div class="list-card"><div class="list-card-head">'
+        f'<div class="list-card-title" onclick="selectList({list_id})">'
+        f'<span class="list-card-icon">{LIST_TYPE_ICONS.get(lst["list_type"], "📋")}</span>'
+        f'<span class="list-card-name">{escape(lst["name"], False)}</span></div>'
+        f'<button class="list-card-delete" onclick="deleteList({list_id})">×</button></div>'
+        f'<div class="list-card-body" onclick="selectList({list_id})">{preview}</div></div>'
+    )
 
-        preview_html = ""
-        unpurchased = [i for i in items if not i['purchased']]
+def generate_all_lists_html(lists, previews):
+    if not lists:
+        return EMPTY_LISTS_HTML
+    cards = "".join([render_list_card(lst, previews.get(lst['id'], ())) for lst in lists])
+    return f'<div class="lists-grid">{cards}</div>'
+
+def render_search_match(text):
+    start, end = SEARCH_HIGHLIGHT
+    return escape(text, False).replace(start, "<mark>").replace(end, "</mark>")
+
+def generate_search_results_html(query, lists, items):
+    """Search results for the All Lists view; every row opens its list."""
+    if not lists and not items:
+        return f'<div class="empty-note">No lists or items match "{escape(query, False)}"</div>'
+    sections = []
+    if lists:
+        rows = "".join([
+            f'<div class="search-row" onclick="selectList({lst["id"]})">'
+            f'<span class="list-card-icon">{LIST_TYPE_ICONS.get(lst["list_type"], "📋")}</span>'
+            f'<span class="search-name">{render_search_match(lst["match"])}</span></div>'
+            for lst in lists
+        ])
+        sections.append(f'<div class="section-header">Lists</div>{rows}')
+    if items:
+        rows = "".join([
+            f'<div class="search-row{" done" if item["purchased"] else ""}" onclick="selectList({item["list_id"]})">'
+            f'<span class="search-name">{render_search_match(item["match"])}</span>'
+            f'<span class="search-list">{LIST_TYPE_ICONS.get(item["list_type"], "📋")} {escape(item["list_name"], False)}</span></div>'
+            for item in items
+        ])
+        sections.append(f'<div class="section-header">Items</div>{rows}')
+    return f'<div class="lists-grid"><div class="item-panel">{"".join(sections)}</div></div>'
+
+def render_item_row(item):
+    """One row of the single-list view, also sent on its own in list patches."""
+    item_id = item['id']
+    if item['purchased']:
+        done, checked = " done", " checked"
+    else:
+        done = checked = ""
+    quantity = item['quantity']
+    qty = f' <span class="item-qty">×{quantity}</span>' if quantity > 1 else ""
+    return (
+        f'<div id="row-{item_id}" class="item-row{done}" data-added="{item["added_at"]}">'
+        f'<input type="checkbox" id="item-{item_id}" class="item-cb"{checked} onchange="toggleItem({item_id})">'
+        f'<label for="item-{item_id}" class="item-label">{escape(item["name"], False)}{qty}</label>'
+        f'<button class="item-delete" onclick="deleteItem({item_id})">×</button></div>'
+    )
 
-        for item in unpurchased[:4]:
-            preview_html += f'''<div style="display: flex; align-items: center; padding: 3px 0; color: #555; font-size: 14px;">
-                <span style="color: #0097A7; margin-right: 8px; font-size: 8px;">●</span>
-                <span>{item['name']}</span>
-            </div>'''
+def encode_page_cursor(cursor):
+    return f"{cursor[0]}|{cursor[1]}" if cursor else ""
 
-        remaining = len(unpurchased) - 4
-        if remaining > 0:
-            preview_html += f'<div style="color: #0097A7; font-size: 13px; padding-top: 4px;">+ {remaining} more items</div>'
+def decode_page_cursor(value):
+    added_at, _, item_id = value.rpartition("|")
+    return added_at, int(item_id)
 
-        if not unpurchased:
-            if items:
-                preview_html = '<div style="color: #4CAF50; font-size: 14px; padding: 4px 0;">✓ All items completed!</div>'
-            else:
-                preview_html = '<div style="color: #999; font-size: 14px; font-style: italic; padding: 4px 0;">No items yet</div>'
-
-        html += f'''
-        <div style="background: white; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.08); overflow: hidden; border: 1px solid #e8e8e8;">
-            <div style="display: flex; align-items: center; justify-content: space-between; padding: 14px 16px; border-bottom: 1px solid #f0f0f0;">
-                <div style="display: flex; align-items: center; gap: 10px; cursor: pointer; flex: 1;" onclick="selectList({list_id})">
-                    <span style="font-size: 20px;">{icon}</span>
-                    <span style="color: #0097A7; font-size: 17px; font-weight: 600;">{list_name}</span>
-                </div>
-                <button onclick="deleteList({list_id})" style="background: none; border: none; color: #999; font-size: 20px; cursor: pointer; padding: 4px 8px; border-radius: 4px;" onmouseover="this.style.color='#f44336'" onmouseout="this.style.color='#999'">×</button>
-            </div>
-            <div style="padding: 12px 16px; cursor: pointer;" onclick="selectList({list_id})">
-                {preview_html}
-            </div>
-        </div>'''
+def generate_single_list_html(list_info, items, completed_total=None, completed_cursor=None):
+    """Render the single-list view.
 
-    html += '</div>'
-    return html
-
-def generate_single_list_html(list_info, items):
+    `items` may hold only the newest page of completed items (see get_list_view);
+    completed_total then sets the header count and completed_cursor adds a
+    "Show older" button that pages in the rest.
+    """
     if not list_info:
         return ""
 
-    items_html = ""
-    unpurchased = [i for i in items if not i['purchased']]
-    purchased = [i for i in items if i['purchased']]
-
-    for item in unpurchased:
-        items_html += f'''
-        <div style="display: flex; align-items: center; padding: 14px 16px; background: white; border-bottom: 1px solid #f0f0f0;">
-            <input type="checkbox" id="item-{item['id']}" onchange="toggleItem({item['id']})"
-                style="width: 22px; height: 22px; margin-right: 14px; accent-color: #0097A7; cursor: pointer; flex-shrink: 0;">
-            <label for="item-{item['id']}" style="flex: 1; color: #333; font-size: 16px; cursor: pointer;">{item['name']}</label>
-            <button onclick="deleteItem({item['id']})" style="background: none; border: none; color: #ccc; font-size: 18px; cursor: pointer; padding: 4px 8px;" onmouseover="this.style.color='#f44336'" onmouseout="this.style.color='#ccc'">×</button>
-        </div>'''
-
-    if purchased:
-        items_html += f'''<div style="padding: 12px 16px; background: #f9f9f9; color: #999; font-size: 13px; font-weight: 500; text-transform: uppercase; letter-spacing: 0.5px;">
-            Completed ({len(purchased)})
-        </div>'''
-        for item in purchased:
-            items_html += f'''
-            <div style="display: flex; align-items: center; padding: 14px 16px; background: #fafafa; border-bottom: 1px solid #f0f0f0;">
-                <input type="checkbox" id="item-{item['id']}" checked onchange="toggleItem({item['id']})"
-                    style="width: 22px; height: 22px; margin-right: 14px; accent-color: #0097A7; cursor: pointer; flex-shrink: 0;">
-                <label for="item-{item['id']}" style="flex: 1; color: #999; font-size: 16px; text-decoration: line-through; cursor: pointer;">{item['name']}</label>
-                <button onclick="deleteItem({item['id']})" style="background: none; border: none; color: #ccc; font-size: 18px; cursor: pointer; padding: 4px 8px;" onmouseover="this.style.color='#f44336'" onmouseout="this.style.color='#ccc'">×</button>
-            </div>'''
+    # Sections keep fixed ids so applyListPatch() can move rows between them
+    open_rows = []
+    completed_rows = []
+    for item in items:
+        (completed_rows if item['purchased'] else open_rows).append(render_item_row(item))
+    if completed_total is None:
+        completed_total = len(completed_rows)
+    hide_header = "" if completed_total else " hidden"
+    hide_empty = " hidden" if open_rows or completed_total else ""
+    hide_more = "" if completed_cursor else " hidden"
 
-    if not items:
-        items_html = '''
-        <div style="text-align: center; padding: 60px 20px; color: #999;">
-            <div style="font-size: 48px; margin-bottom: 16px;">📝</div>
-            <p style="font-size: 16px; margin: 0;">This list is empty</p>
-            <p style="font-size: 14px;">Add your first item above!</p>
-        </div>'''
+    return (
+        f'<div id="list-items" class="item-panel" data-list-id="{list_info["id"]}" data-revision="{list_info["revision"]}">'
+        f'<div id="open-items">{"".join(open_rows)}</div>'
+        f'<div id="completed-header" class="section-header"{hide_header}>'
+        f'Completed (<span id="completed-count">{completed_total}</span>)</div>'
+        f'<div id="completed-items">{"".join(completed_rows)}</div>'
+        f'<button id="load-more-completed" class="load-more" data-after="{encode_page_cursor(completed_cursor)}"'
+        f' onclick="loadMoreCompleted()"{hide_more}>Show older completed items</button>'
+        f'<div id="empty-list" class="empty-state"{hide_empty}><div class="empty-icon">📝</div>'
+        f'<p class="empty-title">This list is empty</p><p class="empty-hint">Add your first item above!</p></div></div>'
+    )
 
-    return f'''<div style="background: white; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.08); overflow: hidden;">{items_html}</div>'''
+def generate_list_patch(list_id, upserted=(), removed=(), appended=(), more=None, page=False):
+    """Row-level changes for an open single-list view, applied by applyListPatch() in app_js.
+
+    Upserted rows replace any existing row with the same id and are placed in
+    the open or completed section newest first; removed ids are dropped.
+    Appended rows are an older page of completed items. A page patch
+    (page=True) always carries `more`, the cursor for the page after them,
+    which re-enables the "Show older" button, or hides it when None.
+    """
+    ops = [{"op": "remove", "id": item_id} for item_id in removed]
+    for item in upserted:
+        ops.append({
+            "op": "upsert",
+            "id": item['id'],
+            "section": "completed" if item['purchased'] else "open",
+            "added_at": item['added_at'],
+            "html": render_item_row(item),
+        })
+    for item in appended:
+        ops.append({"op": "append", "id": item['id'], "section": "completed", "html": render_item_row(item)})
+    patch = {"list_id": int(list_id), "ops": ops}
+    if page:
+        patch["more"] = more if isinstance(more, str) else encode_page_cursor(more)
+    return patch
+
+def render_pick_list(prefix, items):
+    """Pre-checked candidate items from Bruno or Smart Scan."""
+    rows = "".join([
+        f'<div class="item-row"><input type="checkbox" id="{prefix}-{i}" checked class="item-cb {prefix}-item-cb" data-item="{escape(label)}">'
+        f'<label for="{prefix}-{i}" class="item-label">{escape(label, False)}</label></div>'
+        for i, label in enumerate(map(item_label, items))
+    ])
+    return f'<div class="item-panel">{rows}</div>'
 
 def generate_parsed_items_html(items):
     if not items:
-        return '<div style="color: #999; padding: 20px; text-align: center;">No items parsed yet</div>'
-
-    html = '<div style="background: white; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.08); overflow: hidden;">'
-    for i, item in enumerate(items):
-        html += f'''
-        <div style="display: flex; align-items: center; padding: 14px 16px; border-bottom: 1px solid #f0f0f0;">
-            <input type="checkbox" id="parsed-{i}" checked class="parsed-item-cb" data-item="{item}"
-                style="width: 22px; height: 22px; margin-right: 14px; accent-color: #0097A7; cursor: pointer;">
-            <label for="parsed-{i}" style="flex: 1; color: #333; font-size: 16px; cursor: pointer;">{item}</label>
-        </div>'''
-    html += '</div>'
-    return html
+        return '<div class="empty-note">No items parsed yet</div>'
+    return render_pick_list("parsed", items)
 
 def generate_scanned_items_html(items):
     """Generate HTML for scanned items from Smart Scan."""
     if not items:
-        return '<div style="color: #999; padding: 20px; text-align: center;">No items extracted yet. Upload an image and click "Extract Items".</div>'
-
-    html = '<div style="background: white; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.08); overflow: hidden;">'
-    for i, item in enumerate(items):
-        html += f'''
-        <div style="display: flex; align-items: center; padding: 14px 16px; border-bottom: 1px solid #f0f0f0;">
-            <input type="checkbox" id="scanned-{i}" checked class="scanned-item-cb" data-item="{item}"
-                style="width: 22px; height: 22px; margin-right: 14px; accent-color: #0097A7; cursor: pointer;">
-            <label for="scanned-{i}" style="flex: 1; color: #333; font-size: 16px; cursor: pointer;">{item}</label>
-        </div>'''
-    html += '</div>'
-    return html
+        return '<div class="empty-note">No items extracted yet. Upload an image and click "Extract Items".</div>'
+    return render_pick_list("scanned", items)
 
 # ============== CSS ==============
 custom_css = """
@@ -587,15 +2580,134 @@ input[type="checkbox"]:checked::after {
 .status-success { background: #e8f5e9; color: #2e7d32; }
 .status-error { background: #ffebee; color: #c62828; }
 .status-info { background: #e3f2fd; color: #1565c0; }
+
+/* Rendered list HTML (see the HTML Generators templates) */
+.lists-grid { display: flex; flex-direction: column; gap: 12px; padding: 16px; }
+
+.list-card {
+    background: white;
+    border-radius: 12px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.08);
+    overflow: hidden;
+    border: 1px solid #e8e8e8;
+}
+
+.list-card-head {
+    display: flex;
+    align-items: center;
+    justify-content: space-between;
+    padding: 14px 16px;
+    border-bottom: 1px solid #f0f0f0;
+}
+
+.list-card-title { display: flex; align-items: center; gap: 10px; cursor: pointer; flex: 1; }
+.list-card-icon { font-size: 20px; }
+.list-card-name { color: #0097A7; font-size: 17px; font-weight: 600; }
+.list-card-body { padding: 12px 16px; cursor: pointer; }
+
+.list-card-delete, .item-delete {
+    background: none;
+    border: none;
+    color: #999;
+    font-size: 20px;
+    cursor: pointer;
+    padding: 4px 8px;
+    border-radius: 4px;
+}
+
+.item-delete { color: #ccc; font-size: 18px; }
+.list-card-delete:hover, .item-delete:hover { color: #f44336; }
+
+.preview-row { display: flex; align-items: center; padding: 3px 0; color: #555; font-size: 14px; }
+.preview-dot { color: #0097A7; margin-right: 8px; font-size: 8px; }
+.preview-more { color: #0097A7; font-size: 13px; padding-top: 4px; }
+.preview-done { color: #4CAF50; font-size: 14px; padding: 4px 0; }
+.preview-empty { color: #999; font-size: 14px; font-style: italic; padding: 4px 0; }
+
+.item-panel {
+    background: white;
+    border-radius: 12px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.08);
+    overflow: hidden;
+}
+
+.item-row {
+    display: flex;
+    align-items: center;
+    padding: 14px 16px;
+    background: white;
+    border-bottom: 1px solid #f0f0f0;
+}
+
+.item-row.done { background: #fafafa; }
+.item-cb { margin-right: 14px; flex-shrink: 0; accent-color: #0097A7; }
+.item-label { flex: 1; color: #333; font-size: 16px; cursor: pointer; }
+.item-row.done .item-label { color: #999; text-decoration: line-through; }
+.item-qty { color: #0097A7; font-size: 14px; font-weight: 600; }
+
+.section-header {
+    padding: 12px 16px;
+    background: #f9f9f9;
+    color: #999;
+    font-size: 13px;
+    font-weight: 500;
+    text-transform: uppercase;
+    letter-spacing: 0.5px;
+}
+
+.item-panel [hidden] { display: none !important; }
+
+.load-more {
+    width: 100%;
+    padding: 12px 16px;
+    background: #f9f9f9;
+    border: none;
+    color: #0097A7;
+    font-size: 14px;
+    font-weight: 500;
+    cursor: pointer;
+}
+
+.load-more:hover { background: #e0f7fa; }
+
+.search-row {
+    display: flex;
+    align-items: center;
+    gap: 10px;
+    padding: 12px 16px;
+    border-bottom: 1px solid #f0f0f0;
+    cursor: pointer;
+}
+
+.search-row:hover { background: #e0f7fa; }
+.search-name { flex: 1; color: #333; font-size: 15px; }
+.search-row.done .search-name { color: #999; text-decoration: line-through; }
+.search-list { color: #0097A7; font-size: 13px; white-space: nowrap; }
+.search-name mark { background: #b2ebf2; color: inherit; border-radius: 3px; padding: 0 1px; }
+
+.empty-state { text-align: center; padding: 60px 20px; color: #999; }
+.empty-icon { font-size: 48px; margin-bottom: 16px; }
+.empty-title { font-size: 16px; margin: 0; }
+.empty-hint { font-size: 14px; }
+.empty-state.no-lists { color: #666; }
+.no-lists .empty-title { font-size: 18px; }
+.no-lists .empty-hint { color: #999; }
+.empty-note { color: #999; padding: 20px; text-align: center; }
 """
 
 # ============== Event Handlers ==============
 async def load_all_lists(filter_type):
-    lists = await get_lists(filter_type if filter_type != "All" else None)
-    items_dict = {}
-    for lst in lists:
-        items_dict[lst['id']] = await get_items_preview(lst['id'])
-    return generate_all_lists_html(lists, items_dict)
+    async def render():
+        lists, previews = await get_dashboard(filter_type)
+        return generate_all_lists_html(lists, previews)
+    return await view_cache.fetch(("dashboard", filter_type or "All"), render)
+
+async def handle_search(query, filter_type):
+    """Search box on All Lists: ranked matches while typing, the dashboard when cleared."""
+    if not query or not query.strip():
+        return await load_all_lists(filter_type)
+    lists, items = await search(query)
+    return generate_search_results_html(query.strip(), lists, items)
 
 async def get_list_choices():
     lists = await get_lists()
@@ -605,10 +2717,9 @@ async def handle_select_list(list_id):
     if not list_id:
         return "", gr.update(visible=True), gr.update(visible=False), None, "Lists"
 
-    list_info = await get_list_by_id(int(list_id))
-    items = await get_list_items(int(list_id))
+    list_info, items, completed_total, completed_cursor = await get_list_view(int(list_id))
     return (
-        generate_single_list_html(list_info, items),
+        generate_single_list_html(list_info, items, completed_total, completed_cursor),
         gr.update(visible=False),
         gr.update(visible=True),
         int(list_id),
@@ -636,37 +2747,85 @@ async def handle_delete_list(list_id, filter_type):
 
 async def handle_add_item(list_id, item_name):
     if not list_id or not item_name.strip():
-        return "", ""
-    await add_item(int(list_id), item_name.strip())
-    list_info = await get_list_by_id(int(list_id))
-    items = await get_list_items(int(list_id))
-    return generate_single_list_html(list_info, items), ""
+        return None, ""
+    item = await add_item(int(list_id), item_name.strip())
+    return generate_list_patch(list_id, upserted=[item]), ""
 
 async def handle_toggle_item(item_id, list_id):
     if item_id and list_id:
-        await toggle_item(int(item_id))
-        list_info = await get_list_by_id(int(list_id))
-        items = await get_list_items(int(list_id))
-        return generate_single_list_html(list_info, items)
-    return ""
+        item = await toggle_item(int(item_id))
+        if item is None:
+            return generate_list_patch(list_id, removed=[int(item_id)])
+        return generate_list_patch(list_id, upserted=[item])
+    return None
+
+async def handle_toggle_batch(batch_json):
+    """Apply a debounced batch of optimistic toggles from app_js and return the reconciling patch.
+
+    The batch carries its own list id, so toggles queued just before navigating
+    away still land on the list they were made in.
+    """
+    try:
+        batch = json.loads(batch_json or "{}")
+        list_id = int(batch["list_id"])
+        changes = {int(item_id): bool(p) for item_id, p in batch["changes"].items()}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    if not changes:
+        return None
+    rows = await set_items_purchased(list_id, changes)
+    found = {row['id'] for row in rows}
+    return generate_list_patch(list_id, upserted=rows, removed=[i for i in changes if i not in found])
 
 async def handle_delete_item(item_id, list_id):
     if item_id and list_id:
         await delete_item(int(item_id))
-        list_info = await get_list_by_id(int(list_id))
-        items = await get_list_items(int(list_id))
-        return generate_single_list_html(list_info, items)
-    return ""
+        return generate_list_patch(list_id, removed=[int(item_id)])
+    return None
+
+async def handle_clear_completed(list_id):
+    if not list_id:
+        return ""
+    await clear_completed(int(list_id))
+    return generate_single_list_html(*await get_list_view(int(list_id)))
+
+async def handle_load_more_completed(request_json):
+    """Next page of completed items for the "Show older" button in app_js."""
+    try:
+        request = json.loads(request_json or "{}")
+        list_id = int(request["list_id"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None  # not from app_js, so there is no button waiting on it
+    try:
+        after = decode_page_cursor(request["after"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # Unreadable cursor: hand it back so the button is usable again
+        return generate_list_patch(list_id, more=str(request.get("after") or ""), page=True)
+    rows, cursor = await get_items_page(list_id, True, COMPLETED_PAGE_SIZE, after)
+    return generate_list_patch(list_id, appended=rows, more=cursor, page=True)
 
 async def handle_parse_items(text):
+    """Stream parsed items into the preview as the model produces them."""
     if not text.strip():
-        return "", [], '<div class="status-msg status-error">Please enter some text to parse</div>'
-    items = await parse_items_with_ai(text)
+        yield "", [], '<div class="status-msg status-error">Please enter some text to parse</div>'
+        return
+    yield "", [], '<div class="status-msg status-info">Parsing...</div>'
+    items = []
+    async for items in parse_items_tiered(text):
+        html = generate_parsed_items_html(items)
+        yield html, items, f'<div class="status-msg status-info">Parsing... found {len(items)} so far</div>'
+    if isinstance(items, PartialItems):
+        html = generate_parsed_items_html(items)
+        status = (f'<div class="status-msg status-error">The parse was cut off after {len(items)} items, '
+                  'so some may be missing. Check the list or parse again.</div>')
+        yield html, items, status
+        return
     if items:
         html = generate_parsed_items_html(items)
         status = f'<div class="status-msg status-success">Found {len(items)} items! Select the ones you want to add.</div>'
-        return html, items, status
-    return "", [], '<div class="status-msg status-error">Could not parse any items</div>'
+        yield html, items, status
+        return
+    yield "", [], '<div class="status-msg status-error">Could not parse any items</div>'
 
 async def handle_add_parsed_items(list_id, parsed_items, selected_indices, new_list_name, new_list_type):
     if not parsed_items:
@@ -684,7 +2843,7 @@ async def handle_add_parsed_items(list_id, parsed_items, selected_indices, new_l
     # Add all parsed items (in real app, would filter by checkboxes)
     items_to_add = parsed_items if isinstance(parsed_items, list) else []
     if items_to_add:
-        await add_items_bulk(int(target_list_id), items_to_add)
+        await add_items_bulk(int(target_list_id), [item_entry(item) for item in items_to_add])
         # Refresh the dropdown choices
         choices = await get_list_choices()
         if list_name:
@@ -693,11 +2852,11 @@ async def handle_add_parsed_items(list_id, parsed_items, selected_indices, new_l
     return '<div class="status-msg status-error">No items selected</div>', gr.update()
 
 async def handle_direct_parse(text):
-    """Parse items directly using smart split (no AI) and show preview."""
+    """Parse items directly using the rule parser (no AI) and show preview."""
     if not text.strip():
         return "", [], '<div class="status-msg status-error">Please enter or transcribe some text first</div>'
 
-    items = smart_split_text(text)
+    items, _confidence = rule_parse(text)
     if not items:
         return "", [], '<div class="status-msg status-error">No items found in text</div>'
 
@@ -706,17 +2865,38 @@ async def handle_direct_parse(text):
     return html, items, status
 
 # ============== Smart Scan Handlers ==============
-async def handle_extract_from_image(image_path, list_type):
-    """Extract items from uploaded image using vision model."""
-    if image_path is None:
-        return "", [], '<div class="status-msg status-error">Please upload an image first</div>'
-
-    items = await extract_items_from_image(image_path, list_type)
+async def handle_extract_from_images(image_paths, list_type, grayscale=False):
+    """Extract items from uploaded images, streaming results as each page finishes."""
+    if not image_paths:
+        yield "", [], '<div class="status-msg status-error">Please upload an image first</div>'
+        return
+
+    total = len(image_paths)
+    if total > 1:
+        yield "", [], f'<div class="status-msg status-info">Scanning {total} pages...</div>'
+    items = []
+    try:
+        async for pages_done, items in extract_items_from_images(image_paths, list_type, grayscale):
+            if pages_done < total:
+                status = f'<div class="status-msg status-info">Scanned {pages_done} of {total} pages, {len(items)} items so far...</div>'
+                yield generate_scanned_items_html(items), items, status
+    except OllamaBusy as e:
+        print(f"Smart Scan refused: {e}")
+        yield "", [], '<div class="status-msg status-error">Smart Scan is busy right now, try again shortly.</div>'
+        return
+    if isinstance(items, PartialItems):
+        html = generate_scanned_items_html(items)
+        status = (f'<div class="status-msg status-error">The scan was cut off after {len(items)} items, '
+                  'so some may be missing. Check the list or scan again.</div>')
+        yield html, items, status
+        return
     if items:
         html = generate_scanned_items_html(items)
-        status = f'<div class="status-msg status-success">Found {len(items)} items! Select the ones you want to add.</div>'
-        return html, items, status
-    return "", [], '<div class="status-msg status-error">Could not extract any items from the image. Try a clearer image or different list type.</div>'
+        pages = f" across {total} pages" if total > 1 else ""
+        status = f'<div class="status-msg status-success">Found {len(items)} items{pages}! Select the ones you want to add.</div>'
+        yield html, items, status
+        return
+    yield "", [], '<div class="status-msg status-error">Could not extract any items from the image. Try a clearer image or different list type.</div>'
 
 async def get_lists_for_type(list_type):
     """Get list choices filtered by type."""
@@ -739,7 +2919,7 @@ async def handle_add_scanned_items(list_id, scanned_items, new_list_name, list_t
 
     items_to_add = scanned_items if isinstance(scanned_items, list) else []
     if items_to_add:
-        await add_items_bulk(int(target_list_id), items_to_add)
+        await add_items_bulk(int(target_list_id), [item_entry(item) for item in items_to_add])
         # Refresh the dropdown choices
         choices = await get_lists_for_type(list_type)
         if created_list_name:
@@ -749,7 +2929,7 @@ async def handle_add_scanned_items(list_id, scanned_items, new_list_name, list_t
 
 # ============== Build App ==============
 # JavaScript for interactivity - Gradio 6.x compatible
-app_js = """
+app_js = f"const TOGGLE_BATCH_MS = {TOGGLE_BATCH_MS};\n" + """
 function getGradioInput(elemId) {
     const container = document.getElementById(elemId);
     if (!container) {
@@ -817,20 +2997,142 @@ function setInputValue(elemId, value) {
     }
 }
 
+// Apply a row-level patch from generate_list_patch() to the open single-list view
+function applyListPatch(patch) {
+    if (!patch || !patch.ops) return;
+    const root = document.getElementById('list-items');
+    if (!root || root.dataset.listId !== String(patch.list_id)) return;
+    const completedItems = document.getElementById('completed-items');
+    const countEl = document.getElementById('completed-count');
+    // Older completed rows may not be loaded, so the count is adjusted by delta
+    let completed = Number(countEl.textContent);
+    for (const op of patch.ops) {
+        // A newer optimistic toggle for this row is still queued; its own batch will settle it
+        if (op.op === 'upsert' && pendingToggles.get(String(patch.list_id))?.has(op.id)) continue;
+        const existing = document.getElementById('row-' + op.id);
+        if (existing) {
+            if (op.op !== 'append' && existing.parentElement === completedItems) completed--;
+            existing.remove();
+        }
+        if (op.op === 'remove') continue;
+        const template = document.createElement('template');
+        template.innerHTML = op.html.trim();
+        const section = document.getElementById(op.section + '-items');
+        if (op.op === 'append') {
+            section.appendChild(template.content.firstElementChild);
+            continue;
+        }
+        if (op.section === 'completed') completed++;
+        // Newest first, ties broken by id, matching get_list_items()
+        const before = Array.from(section.children).find(row =>
+            row.dataset.added < op.added_at ||
+            (row.dataset.added === op.added_at && Number(row.id.slice(4)) < op.id));
+        section.insertBefore(template.content.firstElementChild, before || null);
+    }
+    if ('completed_total' in patch) completed = patch.completed_total;
+    if ('more' in patch) {
+        const more = document.getElementById('load-more-completed');
+        more.dataset.after = patch.more;
+        more.hidden = !patch.more;
+        more.disabled = false;
+    }
+    const open = document.getElementById('open-items').children.length;
+    countEl.textContent = completed;
+    document.getElementById('completed-header').hidden = !completed;
+    document.getElementById('empty-list').hidden = Boolean(open || completed);
+}
+
+// Live updates from other devices: server-sent patches for the open list
+let listFeed = null;
+
+function watchOpenList() {
+    const root = document.getElementById('list-items');
+    const listId = root?.dataset.listId;
+    if (listFeed && listFeed.listId === listId) return;
+    unwatchList();
+    if (!listId) return;
+    const source = new EventSource('/lists/' + listId + '/events?since=' + root.dataset.revision);
+    source.listId = listId;
+    source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        const current = document.getElementById('list-items');
+        if (!current || current.dataset.listId !== listId) return;
+        if (event.revision <= Number(current.dataset.revision)) return;
+        current.dataset.revision = event.revision;
+        if (event.deleted) goBack();
+        else if (event.reload) selectList(listId);
+        else applyListPatch(event);
+    };
+    listFeed = source;
+}
+
+function unwatchList() {
+    listFeed?.close();
+    listFeed = null;
+}
+
+function loadMoreCompleted() {
+    const more = document.getElementById('load-more-completed');
+    const listId = document.getElementById('list-items')?.dataset.listId;
+    if (!more || !listId || more.disabled) return;
+    more.disabled = true;
+    setInputValue('more-cursor', JSON.stringify({list_id: listId, after: more.dataset.after}));
+    setTimeout(() => clickGradioButton('load-more-btn'), 200);
+}
+
 function selectList(id) {
     console.log('selectList called with id:', id);
     setInputValue('selected-list-id', String(id));
     setTimeout(() => clickGradioButton('select-btn'), 200);
 }
 
+// Optimistic toggles: list id -> (item id -> desired purchased state), flushed one list per batch
+const pendingToggles = new Map();
+let toggleTimer = null;
+let batchSending = false;
+
 function toggleItem(id) {
     console.log('toggleItem called with id:', id);
-    setInputValue('action-item-id', String(id));
-    setTimeout(() => clickGradioButton('toggle-btn'), 200);
+    if (!TOGGLE_BATCH_MS) {
+        setInputValue('action-item-id', String(id));
+        setTimeout(() => clickGradioButton('toggle-btn'), 200);
+        return;
+    }
+    const checkbox = document.getElementById('item-' + id);
+    if (!checkbox) return;
+    document.getElementById('row-' + id)?.classList.toggle('done', checkbox.checked);
+    const listId = document.getElementById('list-items')?.dataset.listId;
+    if (!pendingToggles.has(listId)) pendingToggles.set(listId, new Map());
+    pendingToggles.get(listId).set(id, checkbox.checked);
+    clearTimeout(toggleTimer);
+    toggleTimer = setTimeout(flushToggles, TOGGLE_BATCH_MS);
+}
+
+function flushToggles() {
+    clearTimeout(toggleTimer);
+    toggleTimer = null;
+    if (!pendingToggles.size) return;
+    // The hidden input holds one batch at a time until its button click fires
+    if (batchSending) {
+        toggleTimer = setTimeout(flushToggles, 250);
+        return;
+    }
+    const [listId, changes] = pendingToggles.entries().next().value;
+    pendingToggles.delete(listId);
+    const batch = {list_id: listId, changes: Object.fromEntries(changes)};
+    console.log('flushToggles sending', batch);
+    batchSending = true;
+    setInputValue('toggle-batch', JSON.stringify(batch));
+    setTimeout(() => {
+        clickGradioButton('toggle-batch-btn');
+        batchSending = false;
+        if (pendingToggles.size && !toggleTimer) toggleTimer = setTimeout(flushToggles, 250);
+    }, 200);
 }
 
 function deleteItem(id) {
     console.log('deleteItem called with id:', id);
+    pendingToggles.forEach(changes => changes.delete(id));
     setInputValue('action-item-id', String(id));
     setTimeout(() => clickGradioButton('delete-btn'), 200);
 }
@@ -845,6 +3147,8 @@ function deleteList(id) {
 
 function goBack() {
     console.log('goBack called');
+    flushToggles();
+    unwatchList();
     clickGradioButton('back-btn');
 }
 
@@ -884,6 +3188,7 @@ def create_app():
 
         # ========== VIEW 1: All Lists ==========
         with gr.Column(visible=True) as all_lists_view:
+            search_box = gr.Textbox(placeholder="🔍 Search all lists and items...", label="", container=False)
             filter_type = gr.Radio(
                 choices=["All", "Shopping", "To Do", "Chores"],
                 value="All",
@@ -904,6 +3209,9 @@ def create_app():
                 new_item_name = gr.Textbox(placeholder="+ Add new item...", label="", container=False, scale=4)
                 add_item_btn = gr.Button("Add", variant="primary", scale=1)
             single_list_html = gr.HTML()
+            # Row-level updates for single_list_html, applied in the browser by applyListPatch()
+            list_patch = gr.JSON(visible=False)
+            clear_completed_btn = gr.Button("🧹 Clear Completed", elem_classes=["action-btn", "secondary-btn"])
             back_btn = gr.Button("← Back to Lists", elem_classes=["action-btn", "secondary-btn"])
 
         # ========== VIEW 3: Bruno ==========
@@ -969,11 +3277,19 @@ def create_app():
                 height=200
             )
 
+            scan_pages = gr.File(
+                file_count="multiple",
+                file_types=["image"],
+                type="filepath",
+                label="...or upload several pages at once"
+            )
+
             scan_list_type = gr.Radio(
                 choices=["Shopping", "To Do", "Chores"],
                 value="Shopping",
                 label="What type of items to extract?"
             )
+            scan_grayscale = gr.Checkbox(label="Black & white (whiteboards, handwriting)", value=False)
 
             extract_btn = gr.Button("🔍 Extract Items", elem_classes=["action-btn"])
             scan_status = gr.HTML()
@@ -993,10 +3309,14 @@ def create_app():
         # interactive=True is required for Gradio 6.x to accept programmatic value changes
         selected_list_id = gr.Textbox(elem_id="selected-list-id", elem_classes=["hidden-trigger"], interactive=True)
         action_item_id = gr.Textbox(elem_id="action-item-id", elem_classes=["hidden-trigger"], interactive=True)
+        toggle_batch = gr.Textbox(elem_id="toggle-batch", elem_classes=["hidden-trigger"], interactive=True)
+        more_cursor = gr.Textbox(elem_id="more-cursor", elem_classes=["hidden-trigger"], interactive=True)
         delete_list_id = gr.Textbox(elem_id="delete-list-id", elem_classes=["hidden-trigger"], interactive=True)
         tab_switch = gr.Textbox(elem_id="tab-switch-input", elem_classes=["hidden-trigger"], interactive=True)
 
         toggle_trigger = gr.Button("T", elem_id="toggle-btn", elem_classes=["hidden-trigger"])
+        toggle_batch_trigger = gr.Button("TB", elem_id="toggle-batch-btn", elem_classes=["hidden-trigger"])
+        load_more_trigger = gr.Button("M", elem_id="load-more-btn", elem_classes=["hidden-trigger"])
         delete_trigger = gr.Button("D", elem_id="delete-btn", elem_classes=["hidden-trigger"])
         select_trigger = gr.Button("S", elem_id="select-btn", elem_classes=["hidden-trigger"])
         delete_list_trigger = gr.Button("X", elem_id="delete-list-btn", elem_classes=["hidden-trigger"])
@@ -1040,6 +3360,8 @@ def create_app():
 
         # Event bindings
         filter_type.change(fn=load_all_lists, inputs=[filter_type], outputs=[all_lists_html])
+        search_box.input(fn=handle_search, inputs=[search_box, filter_type], outputs=[all_lists_html],
+                         trigger_mode="always_last", show_progress="hidden")
 
         create_list_btn.click(
             fn=handle_create_list,
@@ -1061,7 +3383,7 @@ def create_app():
             fn=select_and_update_header,
             inputs=[selected_list_id],
             outputs=[single_list_html, all_lists_view, single_list_view, current_list_id, header_html]
-        )
+        ).then(fn=None, js="() => { setTimeout(watchOpenList, 100); }")
 
         async def delete_and_update(list_id, filter_type):
             result = await handle_delete_list(list_id, filter_type)
@@ -1089,29 +3411,39 @@ def create_app():
             outputs=[all_lists_html, all_lists_view, single_list_view, current_list_id, header_html]
         )
 
-        add_item_btn.click(fn=handle_add_item, inputs=[current_list_id, new_item_name], outputs=[single_list_html, new_item_name])
-        new_item_name.submit(fn=handle_add_item, inputs=[current_list_id, new_item_name], outputs=[single_list_html, new_item_name])
+        def then_apply_patch(event):
+            event.then(fn=None, inputs=[list_patch], js="(patch) => applyListPatch(patch)")
+
+        then_apply_patch(add_item_btn.click(fn=handle_add_item, inputs=[current_list_id, new_item_name], outputs=[list_patch, new_item_name]))
+        then_apply_patch(new_item_name.submit(fn=handle_add_item, inputs=[current_list_id, new_item_name], outputs=[list_patch, new_item_name]))
 
-        toggle_trigger.click(fn=handle_toggle_item, inputs=[action_item_id, current_list_id], outputs=[single_list_html])
-        delete_trigger.click(fn=handle_delete_item, inputs=[action_item_id, current_list_id], outputs=[single_list_html])
+        then_apply_patch(toggle_trigger.click(fn=handle_toggle_item, inputs=[action_item_id, current_list_id], outputs=[list_patch]))
+        then_apply_patch(toggle_batch_trigger.click(fn=handle_toggle_batch, inputs=[toggle_batch], outputs=[list_patch]))
+        then_apply_patch(load_more_trigger.click(fn=handle_load_more_completed, inputs=[more_cursor], outputs=[list_patch]))
+        then_apply_patch(delete_trigger.click(fn=handle_delete_item, inputs=[action_item_id, current_list_id], outputs=[list_patch]))
+        clear_completed_btn.click(fn=handle_clear_completed, inputs=[current_list_id], outputs=[single_list_html])
 
         # Bruno handlers
         # Audio transcription - button click to transcribe
+        # No Gradio-level limit: transcription_pool bounds concurrency and queueing
         transcribe_btn.click(
             fn=transcribe_audio,
             inputs=[audio_input],
             outputs=[ai_text_input, transcribe_status],
-            scroll_to_output=False
+            scroll_to_output=False,
+            concurrency_limit=None
         )
 
         async def parse_and_store(text):
-            html, items, status = await handle_parse_items(text)
-            return html, items, status
+            async for html, items, status in handle_parse_items(text):
+                yield html, items, status
 
+        # No Gradio-level limit on the Ollama paths: the scheduler bounds them
         parse_btn.click(
             fn=parse_and_store,
             inputs=[ai_text_input],
-            outputs=[parsed_items_html, parsed_items_state, ai_status]
+            outputs=[parsed_items_html, parsed_items_state, ai_status],
+            concurrency_limit=None
         )
 
         add_direct_btn.click(
@@ -1127,16 +3459,20 @@ def create_app():
         )
 
         # Smart Scan handlers
-        async def extract_and_store(image_path, list_type):
-            html, items, status = await handle_extract_from_image(image_path, list_type)
+        async def extract_and_store(image_path, page_paths, list_type, grayscale):
+            # The single image is page one when pages are attached too; a file
+            # given in both places is scanned once
+            image_paths = list(dict.fromkeys(path for path in [image_path, *(page_paths or [])] if path))
             # Also update the target list dropdown based on selected type
             choices = await get_lists_for_type(list_type)
-            return html, items, status, gr.update(choices=choices)
+            async for html, items, status in handle_extract_from_images(image_paths, list_type, grayscale):
+                yield html, items, status, gr.update(choices=choices)
 
         extract_btn.click(
             fn=extract_and_store,
-            inputs=[scan_image, scan_list_type],
-            outputs=[scanned_items_html, scanned_items_state, scan_status, scan_target_list]
+            inputs=[scan_image, scan_pages, scan_list_type, scan_grayscale],
+            outputs=[scanned_items_html, scanned_items_state, scan_status, scan_target_list],
+            concurrency_limit=None
         )
 
         # Update target list dropdown when list type changes
@@ -1167,8 +3503,77 @@ def create_app():
 
     return app
 
+# ============== Server ==============
+@asynccontextmanager
+async def lifespan(_server):
+    if WHISPER_PRELOAD:
+        whisper_manager.preload()
+    await init_db()
+    await db_pool.open()
+    await ollama.open()
+    background = []
+    if OLLAMA_PRELOAD:
+        background.append(asyncio.create_task(ollama.residency.preload(ollama)))
+    if ollama.residency.warm_hours is not None:
+        background.append(asyncio.create_task(ollama.residency.keep_warm(ollama)))
+    startup_times["server_ready"] = round(time.perf_counter() - STARTED_AT, 3)
+    print(f"Server ready in {startup_times['server_ready']:.2f}s")
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        change_feed.close()
+        transcription_pool.shutdown()
+        await ollama.close()
+        await db_pool.close()
+
+server = FastAPI(lifespan=lifespan)
+
+@server.get("/stats")
+async def stats():
+    """Runtime counters for watching the app under load."""
+    return {
+        "startup": startup_times,
+        "whisper": whisper_manager.stats(),
+        "transcription": transcription_pool.stats(),
+        "db_pool": db_pool.stats(),
+        "audio": {**audio_stats, **{key: round(audio_stats[key], 3) for key in ("seconds_in", "seconds_removed", "seconds")}},
+        "scan_images": {**scan_image_stats, "seconds": round(scan_image_stats["seconds"], 3)},
+        "parse_tiers": {**parse_tier_stats, "rules_seconds": round(parse_tier_stats["rules_seconds"], 6),
+                        "model_seconds": round(parse_tier_stats["model_seconds"], 3)},
+        "caches": {"parse": parse_cache.stats(), "scan": scan_cache.stats(), "views": view_cache.stats()},
+        "change_feed": change_feed.stats(),
+        "ollama": {**ollama.scheduler.stats(), "residency": ollama.residency.stats()},
+    }
+
+class UvicornServer(uvicorn.Server):
+    """Ends change-feed streams when shutdown starts; uvicorn waits for open
+    responses to finish before running the lifespan teardown."""
+
+    async def shutdown(self, sockets=None):
+        change_feed.close()
+        await super().shutdown(sockets=sockets)
+
+@server.get("/lists/{list_id}/events")
+async def list_events(list_id: int, request: Request, since: int | None = None):
+    """Server-sent row patches for one list, resuming after `since` (or Last-Event-ID)."""
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = max(since or 0, int(last_event_id))
+    subscription = await change_feed.subscribe(list_id, since)
+
+    async def stream():
+        try:
+            async for message in subscription:
+                yield message
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ============== Main ==============
 if __name__ == "__main__":
-    asyncio.run(init_db())
-    app = create_app()
-    app.launch(server_port=7862, server_name="0.0.0.0", share=False, show_error=True, css=custom_css, js=app_js)
+    gr.mount_gradio_app(server, create_app(), path="/", show_error=True, css=custom_css, js=app_js)
+    UvicornServer(uvicorn.Config(server, host="0.0.0.0", port=PORT, timeout_graceful_shutdown=5)).run()
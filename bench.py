@@ -0,0 +1,1239 @@
+"""Benchmarks for the Lists app.
+
+Run everything with ``python bench.py`` or pick benchmarks by name, e.g.
+``python bench.py dashboard``. Each benchmark works against a throwaway
+database so it never touches lists.db.
+"""
+import asyncio
+import base64
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import numpy as np
+from PIL import Image, ImageDraw
+
+import app
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__.removeprefix("bench_")] = fn
+    return fn
+
+
+def timed(fn, repeat=20):
+    """Return the median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def quiet():
+    """Swallow the app's startup/shutdown prints while benchmarking."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+async def with_pool(coro_fn):
+    """Await coro_fn() with the connection pool open, as the server lifespan does."""
+    with quiet():
+        await app.db_pool.open()
+    try:
+        return await coro_fn()
+    finally:
+        with quiet():
+            await app.db_pool.close()
+
+
+def atimed(coro_fn, repeat=20):
+    """Median wall time in milliseconds of awaiting coro_fn() on a fresh loop."""
+    async def run():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await coro_fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+    return asyncio.run(with_pool(run))
+
+
+def fresh_db(num_lists=0, items_per_list=0, purchased_ratio=0.5):
+    """Point app.DATABASE at a new temp database seeded with synthetic lists."""
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="lists-bench-")
+    os.close(fd)
+    app.DATABASE = path
+    app.db_pool = app.ConnectionPool(path)
+    app.view_cache = app.ViewCache(app.VIEW_CACHE_ENTRIES)
+    app.change_feed = app.ChangeFeed(app.FEED_HISTORY, app.FEED_QUEUE_SIZE)
+    with quiet():
+        asyncio.run(app.init_db())
+    db = sqlite3.connect(path)
+    db.execute("DELETE FROM items")
+    db.execute("DELETE FROM lists")
+    types = ["Shopping", "To Do", "Chores"]
+    for n in range(num_lists):
+        list_id = db.execute(
+            "INSERT INTO lists (name, list_type) VALUES (?, ?)", (f"List {n}", types[n % 3])
+        ).lastrowid
+        purchased_cutoff = int(items_per_list * purchased_ratio)
+        db.executemany(
+            "INSERT INTO items (list_id, name, name_key, purchased) VALUES (?, ?, ?, ?)",
+            [(list_id, f"Item {n}-{k}", f"item {n}-{k}", int(k < purchased_cutoff)) for k in range(items_per_list)],
+        )
+    db.commit()
+    db.close()
+    return path
+
+
+def drop_db(path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+async def _load_all_lists_n_plus_one(filter_type):
+    """The pre-batching dashboard path: one connection and query per list."""
+    lists = await app.get_lists(filter_type if filter_type != "All" else None)
+    for lst in lists:
+        async with app.aiosqlite.connect(app.DATABASE) as db:
+            cursor = await db.execute(
+                "SELECT * FROM items WHERE list_id = ? AND purchased = 0 ORDER BY added_at DESC", (lst['id'],)
+            )
+            await cursor.fetchall()
+
+
+@benchmark
+def bench_dashboard():
+    """Dashboard load latency as the number of lists grows."""
+    print(f"{'lists':>6} {'n+1 (ms)':>10} {'batched (ms)':>13}")
+    for num_lists in (10, 50, 150, 500):
+        path = fresh_db(num_lists, items_per_list=12)
+        app.view_cache = app.ViewCache(0)  # time the queries, not cache hits
+        legacy = atimed(lambda: _load_all_lists_n_plus_one("All"), repeat=5)
+        batched = atimed(lambda: app.load_all_lists("All"))
+        print(f"{num_lists:>6} {legacy:>10.2f} {batched:>13.2f}")
+        drop_db(path)
+
+
+async def _get_list_by_id_unpooled(list_id):
+    async with app.aiosqlite.connect(app.DATABASE) as db:
+        db.row_factory = app.aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM lists WHERE id = ?", (list_id,))
+        return await cursor.fetchone()
+
+
+async def _get_list_by_id(list_id):
+    """The point read the list view made before get_list_view, through the pool."""
+    async with app.db_pool.read() as db:
+        cursor = await db.execute("SELECT * FROM lists WHERE id = ?", (list_id,))
+        return await cursor.fetchone()
+
+
+@benchmark
+def bench_pool():
+    """100 concurrent point reads: connection per call vs. the shared pool."""
+    path = fresh_db(100, items_per_list=5)
+    app.view_cache = app.ViewCache(0)  # time the pool, not cache hits
+    unpooled = atimed(lambda: asyncio.gather(*(_get_list_by_id_unpooled(i) for i in range(1, 101))), repeat=5)
+    pooled = atimed(lambda: asyncio.gather(*(_get_list_by_id(i) for i in range(1, 101))), repeat=5)
+    print(f"connect per call: {unpooled:8.2f} ms")
+    print(f"pooled:           {pooled:8.2f} ms")
+
+    async def pool_stats():
+        await asyncio.gather(*(_get_list_by_id(i) for i in range(1, 101)))
+        return app.db_pool.stats()
+
+    print(f"pool stats:       {asyncio.run(with_pool(pool_stats))}")
+    drop_db(path)
+
+
+# Hot read paths and the SQL they run; query_plans checks none of them scans items.
+HOT_QUERIES = {
+    "get_list_items": ("SELECT * FROM items WHERE list_id = ? ORDER BY purchased ASC, added_at DESC, id DESC", (1,)),
+    "get_items_page": ("""
+        SELECT * FROM items WHERE list_id = ? AND purchased = ? AND (added_at, id) < (?, ?)
+        ORDER BY added_at DESC, id DESC LIMIT ?
+    """, (1, 1, "2100-01-01", 0, 50)),
+    "get_lists_by_type": ("SELECT * FROM lists WHERE list_type = ? ORDER BY created_at DESC", ("Shopping",)),
+    "get_dashboard (counts)": ("""
+        SELECT l.*,
+               EXISTS (SELECT 1 FROM items WHERE list_id = l.id) AS has_items,
+               (SELECT COUNT(*) FROM items WHERE list_id = l.id AND purchased = 0) AS open_count
+        FROM lists l
+        WHERE ?1 IS NULL OR l.list_type = ?1
+        ORDER BY l.created_at DESC
+    """, (None,)),
+    "get_dashboard (previews)": ("""
+        SELECT i.list_id, i.name
+        FROM lists l JOIN items i ON i.id IN (
+            SELECT id FROM items
+            WHERE list_id = l.id AND purchased = 0
+            ORDER BY added_at DESC LIMIT ?2
+        )
+        WHERE ?1 IS NULL OR l.list_type = ?1
+        ORDER BY i.list_id, i.added_at DESC
+    """, (None, 4)),
+}
+
+
+@benchmark
+def bench_query_plans():
+    """EXPLAIN QUERY PLAN for the hot queries, plus list-open time with and without indexes."""
+    path = fresh_db(200, items_per_list=1500, purchased_ratio=0.9)
+    db = sqlite3.connect(path)
+    failures = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        print(f"{name}:")
+        for detail in plan:
+            print(f"    {detail}")
+        if any(d.startswith("SCAN i") or d.startswith("SCAN items") for d in plan):
+            failures.append(name)
+
+    app.view_cache = app.ViewCache(0)
+    dashboard = atimed(lambda: app.load_all_lists("All"), repeat=5)
+    sql, _ = HOT_QUERIES["get_list_items"]
+    indexed = timed(lambda: db.execute(sql, (100,)).fetchall())
+    db.execute("DROP INDEX idx_items_list_purchased_added_id")
+    unindexed = timed(lambda: db.execute(sql, (100,)).fetchall(), repeat=5)
+    db.close()
+    print(f"get_list_items on 300k items: {unindexed:.2f} ms without index, {indexed:.2f} ms with")
+    print(f"dashboard on 300k items: {dashboard:.2f} ms")
+    drop_db(path)
+    if failures:
+        raise SystemExit(f"Full scan of items in: {', '.join(failures)}")
+
+
+async def _add_items_one_by_one(list_id, names):
+    """The pre-batching bulk insert: one awaited execute per name."""
+    async with app.db_pool.write() as db:
+        for name in names:
+            await db.execute("INSERT INTO items (list_id, name) VALUES (?, ?)", (list_id, name.strip()))
+
+
+@benchmark
+def bench_bulk():
+    """Items/sec for a 200-item paste, plus batched toggle, delete and clear completed."""
+    path = fresh_db(1)
+    names = [f"Recipe item {k}" for k in range(200)]
+    pastes = iter(range(100))
+
+    def fresh_names():
+        paste = next(pastes)
+        return [f"{name} {paste}" for name in names]
+
+    per_row = atimed(lambda: _add_items_one_by_one(1, names), repeat=10)
+    # Fresh names per paste so every row is an insert rather than a merge
+    batched = atimed(lambda: app.add_items_bulk(1, fresh_names()), repeat=10)
+    print(f"add 200, awaited per row:  {per_row:7.2f} ms  ({200 / per_row * 1000:>9,.0f} items/sec)")
+    print(f"add 200, one statement:    {batched:7.2f} ms  ({200 / batched * 1000:>9,.0f} items/sec)")
+
+    async def end_of_trip():
+        item_ids = [row['id'] for row in await app.get_list_items(1)][:200]
+        start = time.perf_counter()
+        await app.toggle_items(item_ids)
+        toggled = time.perf_counter()
+        removed = await app.clear_completed(1)
+        cleared = time.perf_counter()
+        await app.delete_items([row['id'] for row in await app.get_list_items(1)])
+        deleted = time.perf_counter()
+        print(f"toggle 200:                {(toggled - start) * 1000:7.2f} ms")
+        print(f"clear completed ({removed}):     {(cleared - toggled) * 1000:7.2f} ms")
+        print(f"delete remaining:          {(deleted - cleared) * 1000:7.2f} ms")
+    asyncio.run(with_pool(end_of_trip))
+    drop_db(path)
+
+
+@benchmark
+def bench_merge():
+    """A 200-item paste onto a 1000-item list where half the names are already there."""
+    path = fresh_db(1, 1000)
+    list_id = sqlite3.connect(path).execute("SELECT id FROM lists").fetchone()[0]
+    # Items 0-499 are purchased, 500-999 open; the paste mixes case and spacing
+    existing = [f"item 0-{k}" for k in range(0, 1000, 10)] + [f"  ITEM 0-{k}." for k in range(5, 1000, 10)]
+    names = existing[:100] + [f"Recipe item {k}" for k in range(100)]
+
+    first_new = 0
+
+    async def paste():
+        before = await app.get_list_items(list_id)
+        nonlocal first_new
+        first_new = max(row['id'] for row in before)
+        start = time.perf_counter()
+        rows = await app.add_items_bulk(list_id, names)
+        elapsed = (time.perf_counter() - start) * 1000
+        after = await app.get_list_items(list_id)
+        return elapsed, len(before), len(after), rows
+
+    elapsed, before, after, rows = asyncio.run(with_pool(paste))
+    reactivated = sum(1 for row in rows if row['quantity'] == 1 and row['id'] <= first_new)
+    bumped = sum(1 for row in rows if row['quantity'] > 1)
+    print(f"paste 200 with merge:      {elapsed:7.2f} ms")
+    print(f"rows on list:              {before} -> {after} (plain insert: {before + len(names)})")
+    print(f"new {len(rows) - reactivated - bumped}, reactivated {reactivated}, quantity bumped {bumped}")
+    drop_db(path)
+
+    async def plain_insert():
+        async with app.db_pool.write() as db:
+            await db.executemany("INSERT INTO items (list_id, name) VALUES (?, ?)", [(list_id, name) for name in names])
+
+    path = fresh_db(1, 1000)
+    plain = atimed(plain_insert, repeat=1)
+    print(f"paste 200, plain insert:   {plain:7.2f} ms (duplicates left on the list)")
+    drop_db(path)
+
+
+@benchmark
+def bench_startup():
+    """Time from launching app.py until HTTP responds and until Whisper is loaded."""
+    port = 7899
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(app.__file__)],
+            cwd=workdir, env={**os.environ, "LISTS_PORT": str(port)},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        http_ready = None
+        try:
+            while time.perf_counter() - started < 300:
+                try:
+                    stats = httpx.get(f"http://127.0.0.1:{port}/stats", timeout=1).json()
+                except httpx.HTTPError:
+                    time.sleep(0.05)
+                    continue
+                http_ready = http_ready or time.perf_counter() - started
+                if stats["whisper"]["ready"] or stats["whisper"]["error"]:
+                    break
+                time.sleep(0.1)
+        finally:
+            proc.terminate()
+            proc.wait()
+    print(f"first HTTP response:  {http_ready:6.2f} s after launch")
+    print(f"app-reported startup: {stats['startup']}")
+    print(f"whisper:              {stats['whisper']}")
+
+
+def speech_like(seconds, rng, level=0.3, sample_rate=16000):
+    """Voiced sound with a syllable rhythm: harmonics of a wavering pitch, about 4 syllables/s."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 130 + 25 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, 6))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.abs(np.sin(2 * np.pi * 2.1 * t)) ** 0.5
+    return (level * voice * syllables / 2).astype(np.float32)
+
+
+def sample_clips(sample_rate=16000):
+    """Recordings like Bruno gets, built from speech and pauses over room noise.
+
+    Each clip is a list of (seconds, speaking?) parts; the noise level is in dBFS.
+    """
+    clips = {
+        "quick list": (-60, [(0.8, False), (3.0, True), (1.5, False)]),
+        "thinking pauses": (-60, [(0.5, False), (2.0, True), (3.0, False), (2.0, True), (4.0, False), (1.5, True), (2.0, False)]),
+        "long ramble": (-55, [(1.0, False)] + [(4.0, True), (2.5, False)] * 6 + [(3.0, False)]),
+        "kitchen noise": (-38, [(1.5, False), (2.5, True), (2.0, False), (3.0, True), (2.5, False)]),
+        "accidental tap": (-60, [(2.0, False)]),
+        "pocket recording": (-45, [(20.0, False)]),
+    }
+    rng = np.random.default_rng(7)
+    for name, (noise_db, parts) in clips.items():
+        audio = np.concatenate([speech_like(seconds, rng, sample_rate=sample_rate) if speaking
+                                else np.zeros(int(seconds * sample_rate), np.float32)
+                                for seconds, speaking in parts])
+        audio += rng.normal(0, 10 ** (noise_db / 20), len(audio)).astype(np.float32)
+        yield name, audio
+
+
+@benchmark
+def bench_audio():
+    """Audio seconds before and after silence trimming, and Whisper time saved when Whisper is installed."""
+    try:
+        import whisper
+        model = whisper.load_model(app.WHISPER_MODEL)
+    except Exception as e:
+        model = None
+        print(f"Whisper unavailable ({e}); reporting audio seconds and 30 s Whisper windows only")
+    rate = app.AUDIO_SAMPLE_RATE
+    print(f"{'clip':<18} {'audio in':>9} {'audio out':>10} {'removed':>8} {'windows':>8} {'trim':>7} {'whisper raw':>12} {'whisper trimmed':>16}")
+    totals = {"in": 0.0, "out": 0.0, "raw": 0.0, "trimmed": 0.0}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, audio in sample_clips(rate):
+            start = time.perf_counter()
+            trimmed = app.trim_silence(audio)
+            trim_ms = (time.perf_counter() - start) * 1000
+            seconds_in = len(audio) / rate
+            seconds_out = 0.0 if trimmed is None else len(trimmed) / rate
+            windows = f"{-(-seconds_in // 30):.0f}->{-(-seconds_out // 30):.0f}"
+            raw_s = trimmed_s = ""
+            if model is not None:
+                # A browser recording: 48 kHz stereo WAV, decoded by ffmpeg either way
+                path = os.path.join(workdir, f"{name}.wav")
+                with wave.open(path, "wb") as wav:
+                    wav.setnchannels(2)
+                    wav.setsampwidth(2)
+                    wav.setframerate(3 * rate)
+                    pcm = (np.clip(np.repeat(audio, 3), -1, 1) * 32767).astype(np.int16)
+                    wav.writeframes(np.repeat(pcm, 2).tobytes())
+                start = time.perf_counter()
+                model.transcribe(path)
+                raw = time.perf_counter() - start
+                start = time.perf_counter()
+                with quiet():
+                    prepared = app.prepare_audio(path)
+                if prepared is not None:
+                    model.transcribe(prepared)
+                processed = time.perf_counter() - start
+                totals["raw"] += raw
+                totals["trimmed"] += processed
+                raw_s, trimmed_s = f"{raw:.2f} s", f"{processed:.2f} s"
+            totals["in"] += seconds_in
+            totals["out"] += seconds_out
+            print(f"{name:<18} {seconds_in:>7.1f} s {seconds_out:>8.1f} s {seconds_in - seconds_out:>6.1f} s "
+                  f"{windows:>8} {trim_ms:>4.1f} ms {raw_s:>12} {trimmed_s:>16}")
+    print(f"total: {totals['in']:.1f} s of audio, {totals['in'] - totals['out']:.1f} s removed "
+          f"({(totals['in'] - totals['out']) / totals['in']:.0%})")
+    if model is not None:
+        print(f"whisper: {totals['raw']:.2f} s raw vs. {totals['trimmed']:.2f} s preprocessed, "
+              f"{totals['raw'] - totals['trimmed']:.2f} s saved")
+
+
+class StubOllama:
+    """Minimal local stand-in for Ollama's /api/generate.
+
+    Answers every request with `response` after `delay` seconds, speaking
+    keep-alive HTTP/1.1 like the real server. Streaming requests get the
+    response as NDJSON, one `token_chars`-sized token every `token_delay`
+    seconds. Received payloads are kept in `requests`.
+
+    With `model_delays` ({model: seconds}) it behaves like Ollama on one GPU
+    instead: requests run one at a time, and switching to a different model
+    first costs `swap_delay` seconds (counted in `swaps`). Loading a model
+    when none is loaded costs `load_delay`; a model is unloaded `keep_alive`
+    seconds after its last request (None = never) unless the request sets
+    its own keep_alive. Requests without a prompt only load the model. The
+    load time is reported as load_duration, like Ollama does.
+
+    Requests with a `format` schema get `structured_response` when it is set.
+    Replies stop after options.num_predict tokens; tokens sent are counted in
+    `tokens`, and non-streaming replies also take `token_delay` per token.
+    """
+
+    def __init__(self, response='["Milk", "Eggs", "Bread"]', delay=0.0, token_chars=4, token_delay=0.0,
+                 model_delays=None, swap_delay=0.0, load_delay=0.0, keep_alive=None, structured_response=None):
+        self.response = response
+        self.structured_response = structured_response
+        self.tokens = 0
+        self.delay = delay
+        self.token_chars = token_chars
+        self.token_delay = token_delay
+        self.model_delays = model_delays
+        self.swap_delay = swap_delay
+        self.load_delay = load_delay
+        self.keep_alive = keep_alive
+        self.swaps = 0
+        self.loads = 0
+        self.requests = []
+        self._gpu = threading.Lock()
+        self._loaded = None
+        self._expires = None
+
+    @staticmethod
+    def seconds(duration, default):
+        """Ollama keep_alive ("10m", "30s", "-1", 0) in seconds; None = forever."""
+        if duration is None:
+            return default
+        text = str(duration)
+        if text.startswith("-"):
+            return None
+        scale = {"s": 1, "m": 60, "h": 3600}.get(text[-1], 1)
+        return float(text.rstrip("smh")) * scale
+
+    def infer(self, payload):
+        """Simulate the inference; returns the seconds spent loading the model."""
+        if self.model_delays is None:
+            time.sleep(self.delay)
+            return 0.0
+        model = payload.get("model")
+        with self._gpu:
+            if self._expires is not None and time.monotonic() > self._expires:
+                self._loaded = None
+            load = 0.0
+            if model != self._loaded:
+                load = self.swap_delay if self._loaded else self.load_delay
+                self.swaps += self._loaded is not None
+                self.loads += 1
+                time.sleep(load)
+                self._loaded = model
+            if "prompt" in payload:
+                time.sleep(self.model_delays.get(model, self.delay))
+            keep_alive = self.seconds(payload.get("keep_alive"), self.keep_alive)
+            self._expires = None if keep_alive is None else time.monotonic() + keep_alive
+        return load
+
+    def reply_tokens(self, payload):
+        text = self.response
+        if "format" in payload and self.structured_response is not None:
+            text = self.structured_response
+        tokens = [text[i:i + self.token_chars] for i in range(0, len(text), self.token_chars)]
+        limit = payload.get("options", {}).get("num_predict")
+        return tokens[:limit] if limit else tokens
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(payload)
+                load_duration = int(stub.infer(payload) * 1e9)
+                if payload.get("stream", True):
+                    self.stream(payload, load_duration)
+                    return
+                tokens = stub.reply_tokens(payload)
+                time.sleep(stub.token_delay * len(tokens))
+                stub.tokens += len(tokens)
+                body = json.dumps({"model": payload.get("model"), "response": "".join(tokens), "done": True,
+                                   "load_duration": load_duration, "eval_count": len(tokens)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def stream(self, payload, load_duration):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                tokens = stub.reply_tokens(payload)
+                try:
+                    for n, token in enumerate(tokens + [""]):
+                        time.sleep(stub.token_delay if token else 0)
+                        stub.tokens += bool(token)
+                        done = n == len(tokens)
+                        line = json.dumps({"model": payload.get("model"), "response": token, "done": done,
+                                           **({"load_duration": load_duration} if done else {})})
+                        data = (line + "\n").encode()
+                        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # the client stopped reading, as Ollama allows
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+async def with_ollama(url, coro_fn, scheduler=None, residency=None):
+    """Await coro_fn() with app.ollama pointed at url and open."""
+    app.ollama = app.OllamaClient(url, scheduler=scheduler, residency=residency)
+    await app.ollama.open()
+    try:
+        return await coro_fn()
+    finally:
+        await app.ollama.close()
+
+
+@benchmark
+def bench_ollama_client():
+    """Per-request overhead against a stub Ollama: new client per call vs. the shared client."""
+    payload = {"model": app.OLLAMA_TEXT_MODEL, "prompt": "milk, eggs", "stream": False}
+    with StubOllama() as stub:
+        async def client_per_call():
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                await client.post(f"{stub.url}/api/generate", json=payload)
+
+        async def shared_client():
+            await app.ollama.generate(payload, timeout=app.OLLAMA_TEXT_TIMEOUT)
+
+        async def measure(call, concurrency):
+            async def run():
+                start = time.perf_counter()
+                for _ in range(200 // concurrency):
+                    await asyncio.gather(*(call() for _ in range(concurrency)))
+                return (time.perf_counter() - start) * 1000 / 200
+            return await with_ollama(stub.url, run)
+
+        for concurrency in (1, 8):
+            fresh = asyncio.run(measure(client_per_call, concurrency))
+            shared = asyncio.run(measure(shared_client, concurrency))
+            print(f"concurrency {concurrency}: client per call {fresh:6.3f} ms/request, shared {shared:6.3f} ms/request")
+
+
+@benchmark
+def bench_parse_cache():
+    """Bruno parse latency: Ollama round trip vs. memory and SQLite cache hits."""
+    path = fresh_db()
+    app.parse_cache = app.ResultCache("parse", memory_size=app.PARSE_CACHE_MEMORY, ttl=app.PARSE_CACHE_TTL)
+    text = "need milk eggs and oh yeah we're out of bread also bananas"
+    with StubOllama(response='["Milk", "Eggs", "Bread", "Bananas"]', delay=0.5) as stub:
+        async def run():
+            timings = {}
+            for label in ("miss (Ollama)", "memory hit", "disk hit"):
+                if label == "disk hit":
+                    app.parse_cache._memory.clear()
+                start = time.perf_counter()
+                await app.parse_items_with_ai(text if label != "memory hit" else text.upper() + "  ")
+                timings[label] = (time.perf_counter() - start) * 1000
+            return timings
+        timings = asyncio.run(with_pool(lambda: with_ollama(stub.url, run)))
+        for label, ms in timings.items():
+            print(f"{label:<14} {ms:9.3f} ms")
+        print(f"Ollama requests: {len(stub.requests)}, cache: {app.parse_cache.stats()}")
+    drop_db(path)
+
+
+@benchmark
+def bench_scan_cache():
+    """Smart Scan latency for a 3 MB image: vision round trip vs. repeat scans."""
+    path = fresh_db()
+    app.scan_cache = app.ResultCache("scan", memory_size=app.SCAN_CACHE_MEMORY, max_rows=app.SCAN_CACHE_MAX_ENTRIES)
+    with tempfile.NamedTemporaryFile(suffix=".jpg") as image, StubOllama(delay=1.0) as stub:
+        image.write(os.urandom(3 * 1024 * 1024))
+        image.flush()
+
+        async def run():
+            timings = {}
+            for label, list_type in (("first scan", "Shopping"), ("rescan", "Shopping"),
+                                     ("other list type", "To Do"), ("after restart", "Shopping")):
+                if label == "after restart":
+                    app.scan_cache._memory.clear()
+                start = time.perf_counter()
+                await app.extract_items_from_image(image.name, list_type)
+                timings[label] = (time.perf_counter() - start) * 1000
+            return timings
+        timings = asyncio.run(with_pool(lambda: with_ollama(stub.url, run)))
+        for label, ms in timings.items():
+            print(f"{label:<16} {ms:9.2f} ms")
+        print(f"Ollama requests: {len(stub.requests)}, cache: {app.scan_cache.stats()}")
+    drop_db(path)
+
+
+def sample_scan_images(workdir):
+    """Write synthetic stand-ins for typical Smart Scan uploads and return their paths."""
+    # 12 MP phone photo of a recipe card: noisy color texture with lines of text
+    noise = [Image.effect_noise((4032, 3024), sigma) for sigma in (40, 50, 60)]
+    photo = Image.merge("RGB", noise)
+    draw = ImageDraw.Draw(photo)
+    for row in range(30):
+        draw.text((300, 200 + row * 90), f"{row + 1} cup ingredient number {row}", fill=(20, 20, 20))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90 degrees
+    exif[0x010F] = "PhoneMaker"
+    # 12 MP whiteboard: mostly flat background with marker strokes
+    whiteboard = Image.new("RGB", (4032, 3024), (235, 238, 240))
+    draw = ImageDraw.Draw(whiteboard)
+    for row in range(15):
+        draw.line([(400, 300 + row * 170), (3400, 330 + row * 170)], fill=(30, 60, 160), width=12)
+    # Phone screenshot of a shopping list
+    screenshot = Image.new("RGB", (1170, 2532), "white")
+    draw = ImageDraw.Draw(screenshot)
+    for row in range(40):
+        draw.text((60, 80 + row * 60), f"- item {row}", fill="black")
+
+    paths = {}
+    for name, image, fmt, extra in (("photo.jpg", photo, "JPEG", {"quality": 95, "exif": exif}),
+                                    ("whiteboard.jpg", whiteboard, "JPEG", {"quality": 95}),
+                                    ("screenshot.png", screenshot, "PNG", {})):
+        paths[name] = os.path.join(workdir, name)
+        image.save(paths[name], format=fmt, **extra)
+    return paths
+
+
+@benchmark
+def bench_scan_images():
+    """Bytes sent to the vision model and end-to-end extract time, raw vs. preprocessed."""
+    path = fresh_db()
+    preprocess = app.preprocess_scan_image
+    with tempfile.TemporaryDirectory() as workdir, StubOllama() as stub:
+        samples = sample_scan_images(workdir)
+
+        async def extract(image_path, grayscale):
+            app.scan_cache = app.ResultCache(f"scan-{time.perf_counter()}", memory_size=1)  # always a miss
+            start = time.perf_counter()
+            await app.extract_items_from_image(image_path, "Shopping", grayscale)
+            return (time.perf_counter() - start) * 1000, stub.requests[-1]["images"][0]
+
+        # The stub answers instantly, so "extract" covers preprocessing, encoding and
+        # transfer only; the vision model's prefill cost grows with the pixels sent.
+        print(f"{'image':<16} {'mode':<10} {'pixels':>8} {'sent':>10} {'extract':>10}")
+        for name, image_path in samples.items():
+            for mode, grayscale in (("raw", False), ("processed", False), ("gray", True)):
+                app.preprocess_scan_image = preprocess if mode != "raw" else (lambda data, _grayscale: data)
+                with quiet():
+                    ms, image_b64 = asyncio.run(with_pool(lambda: with_ollama(stub.url, lambda: extract(image_path, grayscale))))
+                sent = base64.b64decode(image_b64)
+                with Image.open(io.BytesIO(sent)) as image:
+                    megapixels = image.width * image.height / 1e6
+                print(f"{name:<16} {mode:<10} {megapixels:>5.1f} MP {len(sent) / 1024:>7.0f} KB {ms:>7.0f} ms")
+    app.preprocess_scan_image = preprocess
+    drop_db(path)
+
+
+@benchmark
+def bench_parse_stream():
+    """Bruno time-to-first-item vs. total with a stub streaming 25 ms tokens."""
+    path = fresh_db()
+    items = [f"Item number {k}" for k in range(12)]
+    with StubOllama(response="Here you go: " + json.dumps(items), token_delay=0.025) as stub:
+        async def run():
+            app.parse_cache = app.ResultCache(f"parse-{time.perf_counter()}")  # always a miss
+            start = time.perf_counter()
+            first = None
+            async for partial in app.parse_items_stream("a long list of things"):
+                first = first or time.perf_counter() - start
+            return first * 1000, (time.perf_counter() - start) * 1000, len(partial)
+        with quiet():
+            first, total, count = asyncio.run(with_pool(lambda: with_ollama(stub.url, run)))
+    print(f"{count} items: first shown after {first:.0f} ms, all after {total:.0f} ms")
+    drop_db(path)
+
+
+@benchmark
+def bench_scan_batch():
+    """Six-page Smart Scan against a stub taking 0.5 s per page, by concurrency."""
+    path = fresh_db()
+    with tempfile.TemporaryDirectory() as workdir, StubOllama(delay=0.5) as stub:
+        pages = []
+        for k in range(6):
+            pages.append(os.path.join(workdir, f"page{k}.png"))
+            Image.new("RGB", (640 + k, 480), "white").save(pages[-1])
+
+        async def run(concurrency):
+            app.scan_cache = app.ResultCache(f"scan-{time.perf_counter()}")  # always a miss
+            start = time.perf_counter()
+            first = None
+            async for _pages_done, items in app.extract_items_from_images(pages, "Shopping", concurrency=concurrency):
+                first = first or time.perf_counter() - start
+            return first, time.perf_counter() - start, len(items)
+
+        for concurrency in (1, 2, 3):
+            with quiet():
+                # Enough vision slots that the page concurrency is what's measured
+                scheduler = app.OllamaScheduler(slots=3, limits={app.OLLAMA_VISION_MODEL: 3})
+                first, total, count = asyncio.run(with_pool(lambda: with_ollama(stub.url, lambda: run(concurrency), scheduler)))
+            print(f"concurrency {concurrency}: first page {first:.2f} s, all pages {total:.2f} s, {count} unique items")
+    drop_db(path)
+
+
+class NoScheduler(app.OllamaScheduler):
+    """The pre-scheduler behavior: every call goes straight to Ollama."""
+
+    def __init__(self):
+        super().__init__(slots=10**6, limits={}, queue_size=10**6)
+
+    @contextlib.asynccontextmanager
+    async def single_flight(self, key):
+        yield app.Flight(asyncio.get_running_loop().create_future(), leader=True)
+
+
+@benchmark
+def bench_ollama_scheduler():
+    """Bruno parses arriving behind three Smart Scans, on a stub that runs one request at a time."""
+    path = fresh_db()
+    delays = {app.OLLAMA_TEXT_MODEL: 0.3, app.OLLAMA_VISION_MODEL: 1.5}
+    texts = ["milk and eggs", "bread, butter", "call mom"] + ["milk and eggs"] * 3
+    with tempfile.TemporaryDirectory() as workdir:
+        pages = []
+        for k in range(3):
+            pages.append(os.path.join(workdir, f"page{k}.png"))
+            Image.new("RGB", (640 + k, 480), "white").save(pages[-1])
+
+        async def run():
+            app.parse_cache = app.ResultCache(f"parse-{time.perf_counter()}")  # always a miss
+            app.scan_cache = app.ResultCache(f"scan-{time.perf_counter()}")
+            start = time.perf_counter()
+
+            async def timed_call(coro):
+                await coro
+                return time.perf_counter() - start
+
+            scans = [asyncio.ensure_future(timed_call(app.extract_items_from_image(page, "Shopping"))) for page in pages]
+            await asyncio.sleep(0.05)
+            parses = await asyncio.gather(*(timed_call(app.parse_items_with_ai(text)) for text in texts))
+            return sorted(parses), max(await asyncio.gather(*scans))
+
+        print(f"{'':<14} {'parse p50':>10} {'parse max':>10} {'scans done':>11} {'requests':>9} {'swaps':>6}")
+        for label, scheduler in (("unscheduled", NoScheduler()), ("scheduled", app.OllamaScheduler())):
+            with StubOllama(model_delays=delays, swap_delay=1.0) as stub:
+                with quiet():
+                    parses, scans = asyncio.run(with_pool(lambda: with_ollama(stub.url, run, scheduler)))
+                print(f"{label:<14} {parses[len(parses) // 2]:>8.2f} s {parses[-1]:>8.2f} s {scans:>9.2f} s "
+                      f"{len(stub.requests):>9} {stub.swaps:>6}")
+        stats = scheduler.stats()
+        waits = ", ".join(f"{model} {model_stats['wait_ms_p95']} ms" for model, model_stats in stats["models"].items())
+        print(f"scheduler: coalesced {stats['coalesced']}, rejected {stats['rejected']}, wait p95: {waits}")
+    drop_db(path)
+
+
+@benchmark
+def bench_residency():
+    """Bruno parses after startup and after idle gaps: default keep-alive vs. preload + residency policy."""
+    path = fresh_db()
+    # Time compressed: a 3 s model load, Ollama's default keep-alive scaled to
+    # 1 s, and idle gaps of 2 s between parses
+    delays = {app.OLLAMA_TEXT_MODEL: 0.2, app.OLLAMA_VISION_MODEL: 0.5}
+    texts = ["milk and eggs", "bread, butter", "call mom"]
+
+    async def session(preload):
+        app.parse_cache = app.ResultCache(f"parse-{time.perf_counter()}")  # always a miss
+        residency = app.ollama.residency
+        if preload:
+            await residency.preload(app.ollama)
+        timings = []
+        for n, text in enumerate(texts):
+            if n:
+                await asyncio.sleep(2.0)
+            start = time.perf_counter()
+            await app.parse_items_with_ai(text)
+            timings.append(time.perf_counter() - start)
+        return timings, residency.stats()["models"][app.OLLAMA_TEXT_MODEL]
+
+    print(f"{'':<22} {'parse 1':>8} {'parse 2':>8} {'parse 3':>8} {'cold':>5} {'warm':>5} {'loads':>6}")
+    for label, keep_alive, preload in (("default keep-alive", {}, False),
+                                       ("preload + keep-alive", {app.OLLAMA_TEXT_MODEL: "10s"}, True)):
+        with StubOllama(model_delays=delays, load_delay=3.0, keep_alive=1.0) as stub:
+            residency = app.ModelResidency(keep_alive={app.OLLAMA_VISION_MODEL: "10s", **keep_alive} if preload else {})
+            with quiet():
+                timings, stats = asyncio.run(with_pool(lambda: with_ollama(stub.url, lambda: session(preload), residency=residency)))
+            print(f"{label:<22} " + " ".join(f"{t:>6.2f} s" for t in timings)
+                  + f" {stats['cold_calls']:>5} {stats['warm_calls']:>5} {stub.loads:>6}")
+    drop_db(path)
+
+
+STRUCTURED_ITEMS = ["Milk", "2 dozen Eggs", "Bread", "6 Bananas", "1.5 lb Chicken thighs", "Olive oil"]
+
+
+@benchmark
+def bench_structured():
+    """Tokens generated and latency: free-form "JSON array only" prompts vs. schema-constrained output."""
+    path = fresh_db()
+    free_items = ["Milk", "2 dozen eggs", "Bread", "6 bananas", "1.5 lb chicken thighs", "Olive oil"]
+    # Replies typical of a 7B model: the bare answer, the answer wrapped in a
+    # preamble and sign-off (free-form only; a schema leaves no room for
+    # prose), and a model stuck repeating items
+    replies = {
+        "clean": (json.dumps(free_items), json.dumps(STRUCTURED_ITEMS)),
+        "chatty": ("Sure! Here are the items extracted from your text:\n\n```json\n" + json.dumps(free_items)
+                   + "\n```\n\nI capitalized the names and kept the quantities. Let me know if you need anything else!",
+                   json.dumps(STRUCTURED_ITEMS)),
+        "looping": (json.dumps(free_items * 40), json.dumps(STRUCTURED_ITEMS * 40)),
+    }
+    text = "need milk, 2 dozen eggs and oh yeah bread, 6 bananas, a pound and a half of chicken thighs, olive oil"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        page = os.path.join(workdir, "page.png")
+        Image.new("RGB", (640, 480), "white").save(page)
+
+        print(f"{'reply':<8} {'path':<6} {'mode':<11} {'prompt tok':>10} {'gen tok':>8} {'latency':>9} {'items':>6}")
+        for label, (free_form, structured) in replies.items():
+            for kind in ("bruno", "scan"):
+                for mode in ("free-form", "structured"):
+                    app.OLLAMA_STRUCTURED = mode == "structured"
+                    with StubOllama(response=free_form, structured_response=structured, token_delay=0.01) as stub:
+                        async def run():
+                            app.parse_cache = app.ResultCache(f"parse-{time.perf_counter()}")  # always a miss
+                            app.scan_cache = app.ResultCache(f"scan-{time.perf_counter()}")
+                            start = time.perf_counter()
+                            if kind == "bruno":
+                                items = await app.parse_items_with_ai(text)
+                            else:
+                                items = await app.extract_items_from_image(page, "Shopping")
+                            return time.perf_counter() - start, items
+                        with quiet():
+                            elapsed, items = asyncio.run(with_pool(lambda: with_ollama(stub.url, run)))
+                    prompt_tokens = len(stub.requests[-1]["prompt"]) // 4
+                    print(f"{label:<8} {kind:<6} {mode:<11} {prompt_tokens:>10} {stub.tokens:>8} "
+                          f"{elapsed * 1000:>6.0f} ms {len(items):>6}")
+    app.OLLAMA_STRUCTURED = True
+    print("tokens are the stub's 4-character chunks; prompt tokens exclude the image")
+    print(f"typed items: {[app.item_label(item) for item in app.typed_items(STRUCTURED_ITEMS)]}")
+    drop_db(path)
+
+
+TIERED_INPUTS = [
+    "milk, eggs, bread",
+    "2 dozen eggs, 3 apples, a loaf of bread, 1 1/2 lb chicken thighs",
+    "- bananas\n- yogurt\n- 2 cans of tomatoes",
+    "½ cup sugar; butter; flour",
+    "call mom\nwater the plants\npay rent",
+    "olive oil",
+    "um so we need milk and uh eggs I think and maybe some bread",
+    "a pound and a half of chicken, rice",
+    "I was thinking we could make tacos tonight so grab tortillas and whatever salsa looks good",
+    "mac and cheese and milk",
+]
+
+
+@benchmark
+def bench_tiered():
+    """Bruno parse latency per input: rule tier when it is confident, model tier otherwise."""
+    path = fresh_db()
+    rows = []
+    with StubOllama(response=json.dumps(["Milk", "Eggs", "Bread"]), token_delay=0.01) as stub:
+        async def run():
+            app.parse_cache = app.ResultCache(f"parse-{time.perf_counter()}")  # always a miss
+            for text in TIERED_INPUTS:
+                before = dict(app.parse_tier_stats)
+                start = time.perf_counter()
+                async for items in app.parse_items_tiered(text):
+                    pass
+                elapsed = time.perf_counter() - start
+                tier = "rules" if app.parse_tier_stats["rules"] > before["rules"] else "model"
+                rows.append((text, app.rule_parse(text)[1], tier, elapsed, len(items)))
+        with quiet():
+            asyncio.run(with_pool(lambda: with_ollama(stub.url, run)))
+
+    print(f"{'input':<42} {'conf':>5} {'tier':<6} {'latency':>10} {'items':>6}")
+    for text, confidence, tier, elapsed, count in rows:
+        label = text.replace("\n", " / ")
+        label = label if len(label) <= 40 else label[:39] + "…"
+        latency = f"{elapsed * 1e6:>7.0f} µs" if tier == "rules" else f"{elapsed * 1000:>7.0f} ms"
+        print(f"{label:<42} {confidence:>5.2f} {tier:<6} {latency:>10} {count:>6}")
+    rules = [elapsed for _, _, tier, elapsed, _ in rows if tier == "rules"]
+    model = [elapsed for _, _, tier, elapsed, _ in rows if tier == "model"]
+    print(f"rules tier: {len(rules)}/{len(rows)} inputs, median {statistics.median(rules) * 1e6:.0f} µs; "
+          f"model tier: median {statistics.median(model) * 1000:.0f} ms (stub)")
+    drop_db(path)
+
+@benchmark
+def bench_toggle_payload():
+    """Bytes and server time per toggle: full list re-render vs. row patch."""
+    print(f"{'items':>6} {'full (bytes)':>13} {'patch (bytes)':>14} {'full (ms)':>10} {'patch (ms)':>11}")
+    for items_per_list in (10, 100, 400):
+        path = fresh_db(1, items_per_list)
+
+        async def full_render(item_id, list_id):
+            await app.toggle_item(item_id)
+            list_info = await _get_list_by_id(list_id)
+            items = await app.get_list_items(list_id)
+            return app.generate_single_list_html(list_info, items)
+
+        async def run():
+            list_id = (await app.get_lists())[0]['id']
+            item_id = (await app.get_list_items(list_id))[0]['id']
+            full = json.dumps(await full_render(item_id, list_id))
+            patch = json.dumps(await app.handle_toggle_item(item_id, list_id))
+            timings = []
+            for fn in (full_render, app.handle_toggle_item):
+                start = time.perf_counter()
+                for _ in range(20):
+                    await fn(item_id, list_id)
+                timings.append((time.perf_counter() - start) * 1000 / 20)
+            return len(full.encode()), len(patch.encode()), *timings
+
+        full_bytes, patch_bytes, full_ms, patch_ms = asyncio.run(with_pool(run))
+        print(f"{items_per_list:>6} {full_bytes:>13} {patch_bytes:>14} {full_ms:>10.2f} {patch_ms:>11.2f}")
+        drop_db(path)
+
+
+@benchmark
+def bench_toggle_batch():
+    """Checking off 30 items: one handler call per toggle vs. one debounced batch."""
+    path = fresh_db(1, 200, purchased_ratio=0)
+
+    async def run():
+        list_id = (await app.get_lists())[0]['id']
+        ids = [item['id'] for item in await app.get_list_items(list_id)][:30]
+        start = time.perf_counter()
+        for item_id in ids:
+            await app.handle_toggle_item(item_id, list_id)
+        single = (time.perf_counter() - start) * 1000
+        batch = json.dumps({"list_id": list_id, "changes": {item_id: False for item_id in ids}})
+        start = time.perf_counter()
+        patch = await app.handle_toggle_batch(batch)
+        batched = (time.perf_counter() - start) * 1000
+        return single, batched, len(patch["ops"])
+
+    single, batched, ops = asyncio.run(with_pool(run))
+    print(f"30 single toggles: {single:7.2f} ms (30 round trips)")
+    print(f"one batch:         {batched:7.2f} ms (1 round trip, {ops} row ops)")
+    drop_db(path)
+
+
+# The pre-template generators: `+=` concatenation with inline styles on every element
+def _legacy_all_lists_html(lists, previews):
+    if not lists:
+        return """
+        <div style="text-align: center; padding: 60px 20px; color: #666;">
+            <div style="font-size: 48px; margin-bottom: 16px;">📝</div>
+            <p style="font-size: 18px; margin: 0;">No lists yet!</p>
+            <p style="font-size: 14px; color: #999;">Create your first list below.</p>
+        </div>
+        """
+
+    html = '<div style="display: flex; flex-direction: column; gap: 12px; padding: 16px;">'
+
+    for lst in lists:
+        list_id = lst['id']
+        list_name = lst['name']
+        list_type = lst['list_type']
+        preview_names = previews.get(list_id, [])
+
+        type_icons = {"Shopping": "🛒", "To Do": "✅", "Chores": "🏠"}
+        icon = type_icons.get(list_type, "📋")
+
+        preview_html = ""
+        for name in preview_names:
+            preview_html += f'''<div style="display: flex; align-items: center; padding: 3px 0; color: #555; font-size: 14px;">
+                <span style="color: #0097A7; margin-right: 8px; font-size: 8px;">●</span>
+                <span>{name}</span>
+            </div>'''
+
+        remaining = lst['open_count'] - len(preview_names)
+        if remaining > 0:
+            preview_html += f'<div style="color: #0097A7; font-size: 13px; padding-top: 4px;">+ {remaining} more items</div>'
+
+        if not lst['open_count']:
+            if lst['has_items']:
+                preview_html = '<div style="color: #4CAF50; font-size: 14px; padding: 4px 0;">✓ All items completed!</div>'
+            else:
+                preview_html = '<div style="color: #999; font-size: 14px; font-style: italic; padding: 4px 0;">No items yet</div>'
+
+        html += f'''
+        <div style="background: white; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.08); overflow: hidden; border: 1px solid #e8e8e8;">
+            <div style="display: flex; align-items: center; justify-content: space-between; padding: 14px 16px; border-bottom: 1px solid #f0f0f0;">
+                <div style="display: flex; align-items: center; gap: 10px; cursor: pointer; flex: 1;" onclick="selectList({list_id})">
+                    <span style="font-size: 20px;">{icon}</span>
+                    <span style="color: #0097A7; font-size: 17px; font-weight: 600;">{list_name}</span>
+                </div>
+                <button onclick="deleteList({list_id})" style="background: none; border: none; color: #999; font-size: 20px; cursor: pointer; padding: 4px 8px; border-radius: 4px;" onmouseover="this.style.color='#f44336'" onmouseout="this.style.color='#999'">×</button>
+            </div>
+            <div style="padding: 12px 16px; cursor: pointer;" onclick="selectList({list_id})">
+                {preview_html}
+            </div>
+        </div>'''
+
+    html += '</div>'
+    return html
+
+
+
+def _legacy_single_list_html(list_info, items):
+    if not list_info:
+        return ""
+
+    items_html = ""
+    unpurchased = [i for i in items if not i['purchased']]
+    purchased = [i for i in items if i['purchased']]
+
+    for item in unpurchased:
+        items_html += f'''
+        <div style="display: flex; align-items: center; padding: 14px 16px; background: white; border-bottom: 1px solid #f0f0f0;">
+            <input type="checkbox" id="item-{item['id']}" onchange="toggleItem({item['id']})"
+                style="width: 22px; height: 22px; margin-right: 14px; accent-color: #0097A7; cursor: pointer; flex-shrink: 0;">
+            <label for="item-{item['id']}" style="flex: 1; color: #333; font-size: 16px; cursor: pointer;">{item['name']}</label>
+            <button onclick="deleteItem({item['id']})" style="background: none; border: none; color: #ccc; font-size: 18px; cursor: pointer; padding: 4px 8px;" onmouseover="this.style.color='#f44336'" onmouseout="this.style.color='#ccc'">×</button>
+        </div>'''
+
+    if purchased:
+        items_html += f'''<div style="padding: 12px 16px; background: #f9f9f9; color: #999; font-size: 13px; font-weight: 500; text-transform: uppercase; letter-spacing: 0.5px;">
+            Completed ({len(purchased)})
+        </div>'''
+        for item in purchased:
+            items_html += f'''
+            <div style="display: flex; align-items: center; padding: 14px 16px; background: #fafafa; border-bottom: 1px solid #f0f0f0;">
+                <input type="checkbox" id="item-{item['id']}" checked onchange="toggleItem({item['id']})"
+                    style="width: 22px; height: 22px; margin-right: 14px; accent-color: #0097A7; cursor: pointer; flex-shrink: 0;">
+                <label for="item-{item['id']}" style="flex: 1; color: #999; font-size: 16px; text-decoration: line-through; cursor: pointer;">{item['name']}</label>
+                <button onclick="deleteItem({item['id']})" style="background: none; border: none; color: #ccc; font-size: 18px; cursor: pointer; padding: 4px 8px;" onmouseover="this.style.color='#f44336'" onmouseout="this.style.color='#ccc'">×</button>
+            </div>'''
+
+    if not items:
+        items_html = '''
+        <div style="text-align: center; padding: 60px 20px; color: #999;">
+            <div style="font-size: 48px; margin-bottom: 16px;">📝</div>
+            <p style="font-size: 16px; margin: 0;">This list is empty</p>
+            <p style="font-size: 14px;">Add your first item above!</p>
+        </div>'''
+
+    return f'''<div style="background: white; border-radius: 12px; box-shadow: 0 2px 8px rgba(0,0,0,0.08); overflow: hidden;">{items_html}</div>'''
+
+
+@benchmark
+def bench_render():
+    """HTML generation: inline-style concatenation vs. class-based templates.
+
+    "response" adds the JSON encoding Gradio applies to every HTML output, so it
+    is the server-side cost of sending the view.
+    """
+    print(f"{'items':>6} {'view':<12} {'render (ms)':>17} {'response (ms)':>17} {'size (KB)':>17}")
+    print(f"{'':>6} {'':<12} {'legacy  templates':>17} {'legacy  templates':>17} {'legacy  templates':>17}")
+    for count in (10, 100, 1000):
+        list_info = {"id": 1, "name": "Groceries", "list_type": "Shopping", "revision": 0}
+        items = [
+            {"id": k, "name": f"Item {k}", "purchased": k % 2, "quantity": 1 if k % 5 else 1 + k % 3,
+             "added_at": f"2024-01-01 00:{k // 60 % 60:02d}:{k % 60:02d}"}
+            for k in range(count)
+        ]
+        lists = [
+            {"id": k, "name": f"List {k}", "list_type": "Shopping", "open_count": 9, "has_items": 1}
+            for k in range(count)
+        ]
+        previews = {k: [f"Item {k}-{n}" for n in range(4)] for k in range(count)}
+        cases = [
+            ("single list", lambda: _legacy_single_list_html(list_info, items), lambda: app.generate_single_list_html(list_info, items)),
+            ("dashboard", lambda: _legacy_all_lists_html(lists, previews), lambda: app.generate_all_lists_html(lists, previews)),
+        ]
+        for view, legacy, current in cases:
+            render = [timed(fn) for fn in (legacy, current)]
+            response = [timed(lambda: json.dumps(fn())) for fn in (legacy, current)]
+            size = [len(fn().encode()) / 1024 for fn in (legacy, current)]
+            print(
+                f"{count:>6} {view:<12} {render[0]:>7.3f} {render[1]:>9.3f}"
+                f" {response[0]:>7.3f} {response[1]:>9.3f} {size[0]:>7.1f} {size[1]:>9.1f}"
+            )
+
+
+@benchmark
+def bench_list_open():
+    """Opening a list as its completed history grows: every row vs. one keyset page."""
+    print(f"{'completed':>10} {'all rows (ms)':>14} {'paged (ms)':>11} {'all (KB)':>9} {'paged (KB)':>11}")
+    for completed in (100, 1000, 10000, 50000):
+        path = fresh_db(1, completed + 20, purchased_ratio=completed / (completed + 20))
+        app.view_cache = app.ViewCache(0)  # time the queries, not cache hits
+
+        async def open_all(list_id):
+            list_info = await _get_list_by_id(list_id)
+            return app.generate_single_list_html(list_info, await app.get_list_items(list_id))
+
+        async def open_paged(list_id):
+            return app.generate_single_list_html(*await app.get_list_view(list_id))
+
+        async def run():
+            list_id = (await app.get_lists())[0]['id']
+            sizes = [len((await fn(list_id)).encode()) / 1024 for fn in (open_all, open_paged)]
+            return list_id, sizes
+
+        list_id, sizes = asyncio.run(with_pool(run))
+        everything = atimed(lambda: open_all(list_id), repeat=5)
+        paged = atimed(lambda: open_paged(list_id))
+        print(f"{completed:>10} {everything:>14.2f} {paged:>11.2f} {sizes[0]:>9.0f} {sizes[1]:>11.0f}")
+        drop_db(path)
+
+
+@benchmark
+def bench_view_cache():
+    """A browsing session (dashboard, open list, toggle, back) with the view cache off vs. on."""
+    path = fresh_db(150, 40)
+
+    async def session():
+        lists = await app.get_lists()
+        for n in range(300):
+            list_id = lists[n % 7]['id']  # people revisit a handful of lists
+            await app.load_all_lists(("All", "Shopping")[n % 2])
+            await app.handle_select_list(list_id)
+            if n % 5 == 0:
+                item = (await app.get_list_view(list_id))[1][0]
+                await app.handle_toggle_item(item['id'], list_id)
+            await app.get_list_choices()
+
+    for label, entries in (("off", 0), ("on", app.VIEW_CACHE_ENTRIES)):
+        app.view_cache = app.ViewCache(entries)
+        elapsed = atimed(session, repeat=1)
+        stats = app.view_cache.stats()
+        print(f"cache {label:<3}: {elapsed:8.1f} ms for 300 navigations, hit rate {stats['hit_rate']}")
+    print({kind: stats[kind]["hit_rate"] for kind in app.ViewCache.KINDS})
+    drop_db(path)
+
+
+@benchmark
+def bench_change_feed():
+    """One toggle fanned out to N live viewers of the same list."""
+    path = fresh_db(1, 50)
+    print(f"{'viewers':>8} {'write+fan-out (ms)':>19} {'db reads':>9} {'events':>7}")
+
+    async def run(viewers):
+        app.change_feed = app.ChangeFeed(app.FEED_HISTORY, app.FEED_QUEUE_SIZE)
+        list_id = (await app.get_lists())[0]['id']
+        item_id = (await app.get_list_items(list_id))[0]['id']
+        subscriptions = [await app.change_feed.subscribe(list_id) for _ in range(viewers)]
+        reads = app.db_pool.stats()["read"]["checkouts"]
+        start = time.perf_counter()
+        await app.toggle_item(item_id)
+        received = [await s.queue.get() for s in subscriptions]
+        elapsed = (time.perf_counter() - start) * 1000
+        for s in subscriptions:
+            s.close()
+        return elapsed, app.db_pool.stats()["read"]["checkouts"] - reads, len(received)
+
+    for viewers in (1, 10, 100, 1000):
+        elapsed, reads, events = asyncio.run(with_pool(lambda: run(viewers)))
+        print(f"{viewers:>8} {elapsed:>19.2f} {reads:>9} {events:>7}")
+    drop_db(path)
+
+
+SEARCH_WORDS = (
+    "olive oil milk eggs bread butter cheese organic whole wheat flour sugar salt pepper "
+    "tomato sauce pasta rice beans chicken breast ground beef salmon apples bananas oranges "
+    "spinach lettuce carrots onions garlic potatoes yogurt coffee tea juice cereal oats honey "
+    "vinegar mustard ketchup soap detergent paper towels batteries light bulbs vacuum laundry "
+    "dishes trash recycling water plants call mom pay bills book dentist renew passport"
+).split()
+
+
+@benchmark
+def bench_search():
+    """FTS5 prefix search latency on a 500k-item database."""
+    import random
+    rng = random.Random(7)
+    path = fresh_db()
+    db = sqlite3.connect(path)
+    types = ["Shopping", "To Do", "Chores"]
+    start = time.perf_counter()
+    for n in range(500):
+        list_id = db.execute(
+            "INSERT INTO lists (name, list_type) VALUES (?, ?)",
+            (f"{rng.choice(SEARCH_WORDS).title()} list {n}", types[n % 3]),
+        ).lastrowid
+        db.executemany(
+            "INSERT INTO items (list_id, name, purchased) VALUES (?, ?, ?)",
+            [(list_id, " ".join(rng.sample(SEARCH_WORDS, rng.randint(1, 3))), rng.random() < 0.8) for _ in range(1000)],
+        )
+    db.commit()
+    db.close()
+    print(f"built 500 lists / 500,000 items (index maintained by triggers) in {time.perf_counter() - start:.1f} s")
+
+    print(f"{'query':<16} {'median (ms)':>12} {'lists':>6} {'items':>6}")
+    for query in ("olive oil", "oli", "passport", "whole wheat fl", "pa", "o", "zzz"):
+        lists, items = asyncio.run(with_pool(lambda: app.search(query)))
+        elapsed = atimed(lambda: app.search(query))
+        print(f"{query:<16} {elapsed:>12.2f} {len(lists):>6} {len(items):>6}")
+    drop_db(path)
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
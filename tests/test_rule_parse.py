@@ -0,0 +1,169 @@
+"""Regression cases for Bruno's rule parser and the item helpers around it."""
+
+import pytest
+
+import app
+
+
+def names(text):
+    return [item["name"] for item in app.rule_parse(text)[0]]
+
+
+def confidence(text):
+    return app.rule_parse(text)[1]
+
+
+# ---- list splitting and confidence ----
+
+def test_comma_list_stays_on_rules():
+    assert names("milk, eggs, bread") == ["Milk", "Eggs", "Bread"]
+    assert confidence("milk, eggs, bread") >= app.PARSE_RULE_CONFIDENCE
+
+
+def test_line_and_bullet_lists_stay_on_rules():
+    text = "- paper towels\n- olive oil\n* dish soap\n1. peanut butter"
+    assert names(text) == ["Paper towels", "Olive oil", "Dish soap", "Peanut butter"]
+    assert confidence(text) >= app.PARSE_RULE_CONFIDENCE
+
+
+def test_two_word_phrase_on_its_own_stays_on_rules():
+    assert names("olive oil") == ["Olive oil"]
+    assert confidence("olive oil") >= app.PARSE_RULE_CONFIDENCE
+
+
+def test_unpunctuated_run_escalates():
+    assert confidence("milk eggs bread") < app.PARSE_RULE_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "sweet and sour sauce, bread",
+    "oil and vinegar",
+    "bread and butter pickles",
+    "milk & eggs",
+    "milk plus eggs",
+])
+def test_joining_word_split_escalates(text):
+    assert confidence(text) < app.PARSE_RULE_CONFIDENCE
+
+
+def test_known_compound_is_not_split():
+    assert names("mac and cheese, milk") == ["Mac and cheese", "Milk"]
+    assert confidence("mac and cheese, milk") >= app.PARSE_RULE_CONFIDENCE
+
+
+def test_oxford_comma_and_stays_on_rules():
+    assert names("milk, eggs, and bread") == ["Milk", "Eggs", "Bread"]
+    assert confidence("milk, eggs, and bread") >= app.PARSE_RULE_CONFIDENCE
+
+
+def test_prose_escalates():
+    text = "I was thinking we could make tacos tonight so grab tortillas"
+    assert confidence(text) < app.PARSE_RULE_CONFIDENCE
+
+
+def test_duplicates_are_dropped():
+    assert names("milk, Milk., eggs") == ["Milk", "Eggs"]
+
+
+# ---- filler ----
+
+@pytest.mark.parametrize("text", ["I think eggs", "eggs I think", "um we need eggs", "eggs too", "I guess eggs"])
+def test_filler_is_stripped(text):
+    assert names(text) == ["Eggs"]
+
+
+def test_filler_inside_a_list():
+    assert names("we need milk, eggs I think, and bread") == ["Milk", "Eggs", "Bread"]
+
+
+# ---- amounts and units ----
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 dozen eggs", ("Eggs", 2, "dozen")),
+    ("1 1/2 lb chicken thighs", ("Chicken thighs", 1.5, "lb")),
+    ("1.5 pounds chicken", ("Chicken", 1.5, "lb")),
+    ("½ cup sugar", ("Sugar", 0.5, "cup")),
+    ("a loaf of bread", ("Bread", 1, "loaf")),
+    ("2 cans of tomatoes", ("Tomatoes", 2, "can")),
+    ("three apples", ("Apples", 3, None)),
+    ("a couple of lemons", ("Lemons", 2, None)),
+    ("eggs x3", ("Eggs", 3, None)),
+    ("eggs (4)", ("Eggs", 4, None)),
+    ("an apple", ("Apple", None, None)),
+])
+def test_amount_forms(text, expected):
+    [item] = app.rule_parse(text)[0]
+    assert (item["name"], item["quantity"], item["unit"]) == expected
+
+
+@pytest.mark.parametrize("text", ["1/0 apples", "99999999999999999999 eggs", "eggs x99999999999999"])
+def test_impossible_amounts_escalate(text):
+    assert app.rule_parse(text) == ([], 0.0)
+
+
+def test_impossible_amount_in_a_list_escalates():
+    assert confidence("milk, 1/0 apples") == 0.0
+
+
+def test_dangling_amount_escalates():
+    assert confidence("a pound and a half of chicken, rice") < app.PARSE_RULE_CONFIDENCE
+
+
+# ---- model item strings ----
+
+@pytest.mark.parametrize("value, expected", [
+    ("2 dozen Eggs", ("Eggs", 2, "dozen")),
+    ("Call mom", ("Call mom", None, None)),
+    ("A Tale of Two Cities", ("A Tale of Two Cities", None, None)),
+    ("1/0 apples", ("1/0 apples", None, None)),
+    ({"name": "Eggs", "quantity": 2, "unit": "dozen"}, ("Eggs", 2, "dozen")),
+    ({"name": "Rice", "quantity": 1e30}, ("Rice", None, None)),
+])
+def test_typed_item(value, expected):
+    item = app.typed_item(value)
+    assert (item["name"], item["quantity"], item["unit"]) == expected
+
+
+def test_item_entry_keeps_units_in_the_name():
+    assert app.item_entry({"name": "Eggs", "quantity": 3}) == ("Eggs", 3)
+    assert app.item_entry({"name": "Chicken", "quantity": 1.5, "unit": "lb"}) == ("Chicken (1.5 lb)", 1)
+
+
+# ---- item keys ----
+
+def test_item_key_ignores_case_accents_and_punctuation():
+    assert app.item_key("Milk") == app.item_key(" milk. ") == app.item_key("MILK")
+    assert app.item_key("Jalapeño") == app.item_key("jalapeno")
+    assert app.item_key("2% Milk") != app.item_key("Milk")
+
+
+def test_punctuation_only_names_keep_their_own_key():
+    keys = {app.item_key(name) for name in ("--", "!!", "…")}
+    assert len(keys) == 3
+    assert "" not in keys
+
+
+# ---- streamed JSON arrays ----
+
+def test_json_array_stream_yields_elements_as_they_complete():
+    parser = app.JsonArrayStream()
+    seen = []
+    for fragment in ['Sure: ["Mi', 'lk", "2 doz', 'en Eggs", "Br', 'ead"]', " done"]:
+        seen.extend(parser.feed(fragment))
+    assert seen == ["Milk", "2 dozen Eggs", "Bread"]
+    assert parser.done
+
+
+def test_json_array_stream_cut_off_is_not_done():
+    parser = app.JsonArrayStream()
+    assert parser.feed('["Milk", "Eggs", "Bre') == ["Milk", "Eggs"]
+    assert not parser.done
+
+
+def test_decode_items_reports_cut_off_replies():
+    items, complete = app.decode_items('["Milk", "2 dozen Eggs"]')
+    assert [app.item_label(item) for item in items] == ["Milk", "2 dozen Eggs"]
+    assert complete
+    items, complete = app.decode_items('["Milk", "Eg')
+    assert [item["name"] for item in items] == ["Milk"]
+    assert not complete